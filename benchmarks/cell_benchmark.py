@@ -0,0 +1,108 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the fused cell kernels against the unfused cell kernels, reporting the time per step of the forward pass
+# and of the forward and backward passes of the unfolded cell, and the largest difference between the outputs and
+# states of a single step of the two kernels.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import tensorflow as tf
+import time
+
+# Local imports
+from common import build_graph, session_config
+
+# Random input and states for one step of the cell of a graph
+def _cell_inputs(rnn_name, graph, batch_size, rng):
+    if rnn_name == 'srn':
+        state_sizes = [graph._hidden_size]
+    else:
+        state_sizes = [graph._hidden_size, graph._state_size]
+    x = rng.randint(0, graph._vocabulary_size, size=batch_size).astype(np.int32)
+    if not graph._token_ids_flg:
+        x = np.eye(graph._vocabulary_size, dtype=np.float32)[x]
+    states = [ rng.uniform(-1, 1, size=[batch_size, size]).astype(np.float32) for size in state_sizes ]
+    return tf.constant(x), [ tf.constant(state) for state in states ]
+
+# Largest absolute difference between the outputs and states of one step of the fused and the unfused cell of a graph
+# built with fused cells, where the unfused cell reads the slices of the fused weights
+def cell_difference(rnn_name, graph, batch_size, seed=0):
+    with graph._graph.as_default():
+        x, states = _cell_inputs(rnn_name, graph, batch_size, np.random.RandomState(seed))
+        graph._fused_cell_flg = False
+        unfused = graph._cell(x, *states)
+        graph._fused_cell_flg = True
+        fused = graph._cell(x, *states)
+        with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+            session.run(graph._initialization)
+            unfused, fused = session.run([unfused, fused])
+    return max(np.abs(a - b).max() for a, b in zip(unfused, fused))
+
+# Time per step in microseconds of the forward pass and of the forward and backward passes of num_steps unfoldings of
+# the cell of a graph, taken as the fastest of num_repeats blocks of num_runs runs
+def time_cell_steps(rnn_name, graph, batch_size, num_steps, num_runs=50, num_repeats=5, seed=0):
+    rng = np.random.RandomState(seed)
+    with graph._graph.as_default():
+        _, states = _cell_inputs(rnn_name, graph, batch_size, rng)
+        outputs = []
+        for _ in range(num_steps):
+            x, _ = _cell_inputs(rnn_name, graph, batch_size, rng)
+            results = graph._cell(x, *states)
+            outputs.append(results[0])
+            if rnn_name == 'lstm':
+                states = results
+            else:
+                states = results[1:]
+        forward = tf.add_n([ tf.reduce_sum(output) for output in outputs ])
+        backward = tf.gradients(forward, tf.trainable_variables())
+        backward = [ gradient for gradient in backward if gradient is not None ]
+        times = []
+        with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+            session.run(graph._initialization)
+            for fetches in [forward, backward]:
+                session.run(fetches)
+                block_times = []
+                for _ in range(num_repeats):
+                    start = time.time()
+                    for _ in range(num_runs):
+                        session.run(fetches)
+                    block_times.append(time.time() - start)
+                times.append(1e6 * min(block_times) / (num_runs * num_steps))
+    return times
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', default='scrn,lstm,srn')
+    parser.add_argument('--vocabulary-size', type=int, default=27)
+    parser.add_argument('--hidden-size', type=int, default=100)
+    parser.add_argument('--num-unfoldings', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--one-hot', action='store_true')
+    args = parser.parse_args()
+    
+    print('%-5s %-8s %18s %18s %12s' % ('model', 'cell', 'forward us/step', 'backward us/step', 'difference'))
+    for rnn_name in args.models.split(','):
+        for fused_cell_flg in [False, True]:
+            graph = build_graph(rnn_name, args.vocabulary_size, hidden_size=args.hidden_size,
+                                num_unfoldings=args.num_unfoldings, batch_size=args.batch_size,
+                                token_ids_flg=not args.one_hot, fused_cell_flg=fused_cell_flg)
+            forward_time, backward_time = time_cell_steps(rnn_name, graph, args.batch_size, args.num_unfoldings)
+            if fused_cell_flg:
+                difference = '%.1e' % cell_difference(rnn_name, graph, args.batch_size)
+            else:
+                difference = '-'
+            print('%-5s %-8s %18.1f %18.1f %12s' % (rnn_name, 'fused' if fused_cell_flg else 'unfused', forward_time,
+                                                   backward_time, difference))
+
+if __name__ == '__main__':
+    main()
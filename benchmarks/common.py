@@ -0,0 +1,106 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Shared helpers for the benchmarks of the LSTM, SCRN, and SRN models.  The benchmarks run on synthetic corpora so that
+# they do not depend on a data file, and are run from the root of the repository, e.g.
+#
+#     python benchmarks/softmax_benchmark.py
+#
+# Stuart Hagler, 2017
+
+# Imports
+import numpy as np
+import os
+import sys
+import tensorflow as tf
+import time
+
+# Local imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py'))
+from lstm import lstm_graph
+from scrn import scrn_graph
+from srn import srn_graph
+
+# Generate a corpus of num_tokens tokens drawn from a Zipf distribution over the vocabulary, so that token frequencies
+# fall off roughly as they do for words in natural text
+def zipf_corpus(vocabulary_size, num_tokens, seed=0):
+    rng = np.random.RandomState(seed)
+    probabilities = 1 / np.arange(1, vocabulary_size + 1)
+    probabilities /= probabilities.sum()
+    return rng.choice(vocabulary_size, size=num_tokens, p=probabilities).astype(np.int32)
+
+# Build a graph for the model named by rnn_name with the hyperparameters of the notebook and the given graph options
+def build_graph(rnn_name, vocabulary_size, hidden_size=100, state_size=10, num_unfoldings=50, batch_size=32,
+                optimization_frequency=5, num_gpus=1, **graph_options):
+    if rnn_name == 'srn':
+        return srn_graph(num_gpus, hidden_size, [], vocabulary_size, num_unfoldings, num_unfoldings, batch_size,
+                         batch_size, optimization_frequency, **graph_options)
+    elif rnn_name == 'lstm':
+        return lstm_graph(num_gpus, hidden_size, hidden_size, vocabulary_size, num_unfoldings, num_unfoldings,
+                          batch_size, batch_size, optimization_frequency, **graph_options)
+    elif rnn_name == 'scrn':
+        return scrn_graph(num_gpus, 0.95, hidden_size, state_size, vocabulary_size, num_unfoldings, num_unfoldings,
+                          batch_size, batch_size, optimization_frequency, **graph_options)
+    raise ValueError('Unknown model: %s' % rnn_name)
+
+# Session configuration of a graph, which lets the towers pinned to GPUs fall back to the CPU on machines without them
+# and creates the CPU devices of any towers pinned to CPU cores, without logging the device placement
+def session_config(graph):
+    config = graph._session_config()
+    config.log_device_placement = False
+    return config
+
+# Summary writer that drops the training summaries, so that the benchmarks do not time writing event files
+class null_writer(object):
+    
+    def add_summary(self, summary, global_step=None):
+        pass
+
+# Time in milliseconds of the fastest of num_repeats blocks of num_runs runs of fetches with an optional feed
+def time_fetches(session, fetches, feed_dict=None, num_runs=10, num_repeats=3):
+    session.run(fetches, feed_dict)
+    block_times = []
+    for _ in range(num_repeats):
+        start = time.time()
+        for _ in range(num_runs):
+            session.run(fetches, feed_dict)
+        block_times.append(time.time() - start)
+    return 1e3 * min(block_times) / num_runs
+
+# Time training epochs and validation passes of a graph over a text after a warm-up pass of each, returning the
+# training and validation throughput in tokens per second of the fastest of num_repeats passes and the validation
+# perplexity
+def time_epoch(graph, training_text, validation_text, learning_rate=0.05, momentum=0.9, clip_norm=1.25,
+               num_repeats=3):
+    training_batches = [ graph._batch_generator(tower, training_text, graph._training_batch_size,
+                                                graph._num_training_unfoldings, 2)
+                         for tower in range(graph._num_towers) ]
+    validation_batches = [ graph._batch_generator(tower, validation_text, graph._validation_batch_size,
+                                                  graph._num_validation_unfoldings, 2)
+                           for tower in range(graph._num_towers) ]
+    num_training_tokens = (graph._num_towers * training_batches[0].num_batches() * graph._training_batch_size *
+                           graph._num_training_unfoldings)
+    num_validation_tokens = (graph._num_towers * validation_batches[0].num_batches() * graph._validation_batch_size *
+                             graph._num_validation_unfoldings)
+    training_times = []
+    validation_times = []
+    with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+        session.run(graph._initialization)
+        graph._training_step(session, learning_rate, 1, momentum, clip_norm, training_batches, null_writer(), 0,
+                             np.inf)
+        graph._validation_step(session, learning_rate, 1, momentum, clip_norm, validation_batches, None)
+        for epoch in range(num_repeats):
+            start = time.time()
+            graph._training_step(session, learning_rate, 1, momentum, clip_norm, training_batches, null_writer(),
+                                 epoch + 1, np.inf)
+            training_times.append(time.time() - start)
+            start = time.time()
+            perplexity = graph._validation_step(session, learning_rate, 1, momentum, clip_norm, validation_batches,
+                                                None)
+            validation_times.append(time.time() - start)
+    return num_training_tokens / min(training_times), num_validation_tokens / min(validation_times), perplexity
@@ -0,0 +1,59 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the throughput of scoring a whole text with the evaluation graph at increasing batch sizes against the
+# validation graph at its fixed batch size, which drops the tail of the text.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import tensorflow as tf
+import time
+
+# Local imports
+from common import build_graph, session_config, zipf_corpus
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-unfoldings', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--evaluation-batch-sizes', default='32,128,512,2048')
+    parser.add_argument('--num-repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    text = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    graph = build_graph(args.model, args.vocabulary_size, num_unfoldings=args.num_unfoldings,
+                        batch_size=args.batch_size, token_ids_flg=True)
+    validation_batches = [ graph._batch_generator(0, text, args.batch_size, args.num_unfoldings, 2) ]
+    num_validation_tokens = validation_batches[0].num_batches() * args.batch_size * args.num_unfoldings
+    print('%-12s %10s %14s %16s %12s' % ('graph', 'batch', 'scored tokens', 'tokens/s', 'perplexity'))
+    with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+        session.run(graph._initialization)
+        times = []
+        for _ in range(args.num_repeats + 1):
+            start = time.time()
+            perplexity = graph._validation_step(session, 0, 1, 0, 0, validation_batches, None)
+            times.append(time.time() - start)
+        print('%-12s %10d %14d %16.0f %12.2f' % ('validation', args.batch_size, num_validation_tokens,
+                                                 num_validation_tokens / min(times[1:]), perplexity))
+        for batch_size in [ int(size) for size in args.evaluation_batch_sizes.split(',') ]:
+            times = []
+            for _ in range(args.num_repeats + 1):
+                start = time.time()
+                perplexity = graph.evaluate(session, text, batch_size)
+                times.append(time.time() - start)
+            print('%-12s %10d %14d %16.0f %12.2f' % ('evaluation', batch_size, len(text) - 1,
+                                                     (len(text) - 1) / min(times[1:]), perplexity))
+
+if __name__ == '__main__':
+    main()
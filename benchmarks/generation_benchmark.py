@@ -0,0 +1,79 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the throughput of text generation in generated tokens per second for increasing batch sizes, comparing
+# sampling in the symbolic loop of the generation graph with sampling one step at a time through the inference graph,
+# and reporting beam search with the batch size as the beam width.  The symbolic loop saves a session run per token,
+# which matters most at small batch sizes.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import tensorflow as tf
+import time
+
+# Local imports
+from common import build_graph, session_config, zipf_corpus
+
+# Sample a continuation of each prefix one token at a time with a session run for each token
+def generate_stepwise(graph, session, prefixes, length, rng):
+    prefixes = np.asarray(prefixes, dtype=np.int32)
+    state = graph._zero_state(graph._inference_state, len(prefixes))
+    for i in range(prefixes.shape[1] - 1):
+        _, state = graph.predict(session, prefixes[:, i], state)
+    token_ids = prefixes[:, -1]
+    tokens = []
+    for _ in range(length):
+        probabilities, state = graph.predict(session, token_ids, state)
+        cumulative = np.cumsum(probabilities, 1)
+        token_ids = (cumulative < rng.rand(len(cumulative), 1) * cumulative[:, -1:]).sum(1).astype(np.int32)
+        tokens.append(token_ids)
+    return np.stack(tokens, 1)
+
+# Fastest time of num_repeats calls of a function after a warm-up call
+def best_time(function, num_repeats):
+    function()
+    times = []
+    for _ in range(num_repeats):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--batch-sizes', default='1,16,64,256')
+    parser.add_argument('--prefix-size', type=int, default=20)
+    parser.add_argument('--length', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=0)
+    parser.add_argument('--num-repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    graph = build_graph(args.model, args.vocabulary_size, token_ids_flg=True)
+    prefix = zipf_corpus(args.vocabulary_size, args.prefix_size)
+    rng = np.random.RandomState(0)
+    print('%-10s %10s %20s' % ('generation', 'batch', 'generated tokens/s'))
+    with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+        session.run(graph._initialization)
+        for batch_size in [ int(size) for size in args.batch_sizes.split(',') ]:
+            prefixes = [ prefix ] * batch_size
+            num_tokens = batch_size * args.length
+            for generation, function in [
+                    ('loop', lambda: graph.generate(session, prefixes, args.length, top_k=args.top_k)),
+                    ('stepwise', lambda: generate_stepwise(graph, session, prefixes, args.length, rng)),
+                    ('beam', lambda: graph.beam_search(session, [ prefix ], args.length, batch_size))]:
+                print('%-10s %10d %20.0f' % (generation, batch_size,
+                                             num_tokens / best_time(function, args.num_repeats)))
+
+if __name__ == '__main__':
+    main()
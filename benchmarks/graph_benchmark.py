@@ -0,0 +1,42 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the graph construction time and graph size of the unfolded graph against the while loop graph for
+# increasing numbers of unfoldings.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import time
+
+# Local imports
+from common import build_graph
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=27)
+    parser.add_argument('--num-unfoldings', default='10,50,100')
+    parser.add_argument('--num-gpus', type=int, default=1)
+    args = parser.parse_args()
+    
+    print('%10s %-10s %12s %12s %16s' % ('unfoldings', 'graph', 'build s', 'nodes', 'graph-def bytes'))
+    for num_unfoldings in [ int(n) for n in args.num_unfoldings.split(',') ]:
+        for while_loop_flg in [False, True]:
+            start = time.time()
+            graph = build_graph(args.model, args.vocabulary_size, num_unfoldings=num_unfoldings,
+                                num_gpus=args.num_gpus, token_ids_flg=True, while_loop_flg=while_loop_flg)
+            build_time = time.time() - start
+            graph_def = graph._graph.as_graph_def()
+            print('%10d %-10s %12.2f %12d %16d' % (num_unfoldings, 'loop' if while_loop_flg else 'unfolded',
+                                                   build_time, len(graph_def.node), graph_def.ByteSize()))
+
+if __name__ == '__main__':
+    main()
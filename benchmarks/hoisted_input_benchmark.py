@@ -0,0 +1,48 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the LSTM, SCRN, and SRN models with the inputs of every unfolding of a window projected at once against
+# the models projecting the input in each unfolding, reporting the training and validation throughput for token ID and
+# one-hot inputs.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', default='lstm,scrn,srn')
+    parser.add_argument('--vocabulary-size', type=int, default=27)
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-unfoldings', type=int, default=50)
+    parser.add_argument('--fused-cell', action='store_true')
+    parser.add_argument('--while-loop', action='store_true')
+    args = parser.parse_args()
+
+    text = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    split = 9 * len(text) // 10
+    print('%-6s %-10s %-10s %16s %16s %12s' % ('model', 'inputs', 'projection', 'train tokens/s', 'valid tokens/s',
+                                              'perplexity'))
+    for rnn_name in args.models.split(','):
+        for token_ids_flg in [True, False]:
+            for hoisted_input_flg in [False, True]:
+                graph = build_graph(rnn_name, args.vocabulary_size, num_unfoldings=args.num_unfoldings,
+                                    token_ids_flg=token_ids_flg, fused_cell_flg=args.fused_cell,
+                                    while_loop_flg=args.while_loop, hoisted_input_flg=hoisted_input_flg)
+                training_rate, validation_rate, perplexity = time_epoch(graph, text[:split], text[split:])
+                print('%-6s %-10s %-10s %16.0f %16.0f %12.2f' % (rnn_name, 'ids' if token_ids_flg else 'one-hot',
+                                                                 'hoisted' if hoisted_input_flg else 'cell',
+                                                                 training_rate, validation_rate, perplexity))
+
+if __name__ == '__main__':
+    main()
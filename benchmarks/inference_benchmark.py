@@ -0,0 +1,71 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Load generator benchmark of the inference server, in which each client thread sends the tokens of its own stream one
+# request at a time, reporting the median and 99th percentile request latency, the request throughput, and the mean
+# micro-batch size for each number of clients and maximum micro-batch size.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import tensorflow as tf
+import threading
+import time
+
+# Local imports
+from common import build_graph, session_config, zipf_corpus
+from inference_server import inference_server
+
+# Send the tokens of a stream to the server one request at a time and record the latency of each request
+def run_client(server, stream_id, tokens, latencies):
+    for token_id in tokens:
+        start = time.time()
+        server.predict(stream_id, token_id)
+        latencies.append(time.time() - start)
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--num-clients', default='1,16,64')
+    parser.add_argument('--max-batch-sizes', default='1,16,64')
+    parser.add_argument('--max-wait', type=float, default=0.002)
+    parser.add_argument('--num-requests', type=int, default=200)
+    args = parser.parse_args()
+    
+    graph = build_graph(args.model, args.vocabulary_size, token_ids_flg=True)
+    print('%8s %10s %12s %12s %14s %12s' % ('clients', 'max batch', 'p50 ms', 'p99 ms', 'requests/s', 'mean batch'))
+    with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+        session.run(graph._initialization)
+        for num_clients in [ int(n) for n in args.num_clients.split(',') ]:
+            streams = [ zipf_corpus(args.vocabulary_size, args.num_requests, seed=client)
+                        for client in range(num_clients) ]
+            for max_batch_size in [ int(size) for size in args.max_batch_sizes.split(',') ]:
+                server = inference_server(graph, session, max_batch_size, args.max_wait)
+                server.start()
+                server.predict(-1, 0)
+                latencies = []
+                clients = [ threading.Thread(target=run_client, args=(server, client, streams[client], latencies))
+                            for client in range(num_clients) ]
+                start = time.time()
+                for client in clients:
+                    client.start()
+                for client in clients:
+                    client.join()
+                duration = time.time() - start
+                server.stop()
+                print('%8d %10d %12.2f %12.2f %14.0f %12.1f' % (num_clients, max_batch_size,
+                                                                1000 * np.percentile(latencies, 50),
+                                                                1000 * np.percentile(latencies, 99),
+                                                                len(latencies) / duration, server.mean_batch_size()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of opening model artifacts of SCRN models of growing vocabulary size, reporting the time for a fresh
+# process to open the artifact with the NumPy engine, the time of its first prediction, and for comparison the time to
+# read every array of the artifact into memory.  The parameters are random, since only their sizes matter here.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import os
+import subprocess
+import sys
+import tempfile
+
+# Local imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py'))
+from model_artifact import write_model_artifact
+
+# Code run in a fresh process to time opening an artifact once the modules are imported, its first prediction on a
+# batch of batch_size tokens, and reading all of its arrays into memory
+startup = '''
+import numpy as np
+import sys
+import time
+sys.path.insert(0, %r)
+from model_artifact import model_artifact
+from numpy_engine import numpy_engine
+start = time.time()
+engine = numpy_engine(%r)
+opened = time.time()
+token_ids = np.arange(%d) %% engine._vocabulary_size
+engine.predict(token_ids, engine.zero_state(len(token_ids)))
+predicted = time.time()
+artifact = model_artifact(%r)
+for name in artifact.array_names():
+    np.array(artifact.array(name))
+read = time.time()
+print(opened - start, predicted - opened, read - predicted)
+'''
+
+# Random parameters of an SCRN model
+def scrn_arrays(vocabulary_size, hidden_size, state_size):
+    random = np.random.RandomState(0)
+    shapes = {'A': [vocabulary_size, hidden_size], 'B': [vocabulary_size, state_size],
+              'P': [state_size, hidden_size], 'R': [hidden_size, hidden_size],
+              'U': [hidden_size, vocabulary_size], 'V': [state_size, vocabulary_size]}
+    return { name: random.uniform(-0.1, 0.1, shape).astype(np.float32) for name, shape in shapes.items() }
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vocabulary-sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--hidden-size', type=int, default=100)
+    parser.add_argument('--state-size', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    py_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py')
+    print('%-12s %10s %10s %14s %14s' % ('vocabulary', 'MB', 'open s', 'first step s', 'read all s'))
+    for vocabulary_size in args.vocabulary_sizes:
+        with tempfile.TemporaryDirectory() as path:
+            arrays = scrn_arrays(vocabulary_size, args.hidden_size, args.state_size)
+            hyperparameters = {'model': 'scrn', 'alpha': 0.95, 'hidden_size': args.hidden_size,
+                               'state_size': args.state_size, 'vocabulary_size': vocabulary_size}
+            write_model_artifact(path, arrays, hyperparameters)
+            size = sum([ array.nbytes for array in arrays.values() ]) / 2**20
+            del arrays
+            times = subprocess.check_output([sys.executable, '-c',
+                                             startup % (py_dir, path, args.batch_size, path)]).decode().split()
+            print('%-12d %10.1f %10.4f %14.4f %14.4f' % ((vocabulary_size, size) + tuple(map(float, times[-3:]))))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the scaling of synchronous data-parallel training in worker processes, reporting the training and
+# validation throughput summed over the workers for each number of workers at a fixed batch size across all workers.
+# Each worker trains on its own shard of the corpus and the cores of the host are split evenly between the workers.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+from multiprocess_training import run_workers
+
+# Time the training and validation passes of a worker on its shards of the corpus
+def time_worker(allreduce, model, vocabulary_size, num_unfoldings, batch_size, training_text, validation_text):
+    graph = build_graph(model, vocabulary_size, num_unfoldings=num_unfoldings, batch_size=batch_size,
+                        token_ids_flg=True)
+    graph.setup_allreduce(allreduce)
+    training_rate, validation_rate, _ = time_epoch(graph, training_text, validation_text)
+    return training_rate, validation_rate
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--num-workers', default='1,2,4,8')
+    parser.add_argument('--num-tokens', type=int, default=400000)
+    parser.add_argument('--num-unfoldings', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+    
+    data = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    training_size = 9 * len(data) // 10
+    validation_size = len(data) - training_size
+    num_parameters = build_graph(args.model, args.vocabulary_size, num_unfoldings=args.num_unfoldings,
+                                 token_ids_flg=True).num_parameters()
+    print('%8s %12s %16s %16s %10s' % ('workers', 'worker batch', 'train tokens/s', 'valid tokens/s', 'speed-up'))
+    base_rate = None
+    for num_workers in [ int(n) for n in args.num_workers.split(',') ]:
+        batch_size = args.batch_size // num_workers
+        shard_sizes = [training_size // num_workers, validation_size // num_workers]
+        args_list = [ (args.model, args.vocabulary_size, args.num_unfoldings, batch_size,
+                       data[worker*shard_sizes[0]:(worker+1)*shard_sizes[0]],
+                       data[training_size + worker*shard_sizes[1]:training_size + (worker+1)*shard_sizes[1]])
+                      for worker in range(num_workers) ]
+        rates = run_workers(num_workers, num_parameters, time_worker, args_list)
+        training_rate = sum([ rate[0] for rate in rates ])
+        validation_rate = sum([ rate[1] for rate in rates ])
+        if base_rate is None:
+            base_rate = training_rate
+        print('%8d %12d %16.0f %16.0f %10.2f' % (num_workers, batch_size, training_rate, validation_rate,
+                                                 training_rate / base_rate))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the NumPy engine against the Tensorflow graph, reporting the time for a fresh process to import each of
+# them and load the trained parameters, the throughput of scoring a text, and the perplexity of the text.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import tensorflow as tf
+import time
+
+# Local imports
+from common import build_graph, session_config, zipf_corpus
+
+# Code run in a fresh process to time loading the NumPy engine, including importing NumPy
+numpy_startup = '''
+import time
+start = time.time()
+import sys
+sys.path.insert(0, %r)
+from numpy_engine import numpy_engine
+engine = numpy_engine(%r)
+print(time.time() - start)
+'''
+
+# Code run in a fresh process to time loading the graph, including importing Tensorflow and building the graph
+graph_startup = '''
+import time
+start = time.time()
+import sys
+sys.path.insert(0, %r)
+import tensorflow as tf
+from common import build_graph, session_config
+graph = build_graph(%r, %d, token_ids_flg=True)
+session = tf.Session(graph=graph._graph, config=session_config(graph))
+graph.restore(session, %r)
+print(time.time() - start)
+'''
+
+# Fastest time of a fresh process running code, after a warm-up run that fills the file system caches
+def startup_time(code, num_repeats):
+    times = [ float(subprocess.check_output([sys.executable, '-c', code]).decode().split()[-1])
+              for _ in range(num_repeats + 1) ]
+    return min(times[1:])
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--num-tokens', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--num-repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+    py_dir = os.path.join(benchmark_dir, '..', 'py')
+    text = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    graph = build_graph(args.model, args.vocabulary_size, token_ids_flg=True)
+    with tempfile.TemporaryDirectory() as model_dir, \
+         tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+        session.run(graph._initialization)
+        checkpoint_path = os.path.join(model_dir, 'model')
+        export_path = os.path.join(model_dir, 'artifact')
+        graph._saver.save(session, checkpoint_path)
+        graph.export(session, export_path)
+        from numpy_engine import numpy_engine
+        engine = numpy_engine(export_path)
+        
+        print('%-10s %12s %16s %12s' % ('engine', 'startup s', 'tokens/s', 'perplexity'))
+        for name, code, evaluate in [
+                ('numpy', numpy_startup % (py_dir, export_path), lambda: engine.evaluate(text, args.batch_size)),
+                ('graph', graph_startup % (benchmark_dir, args.model, args.vocabulary_size, checkpoint_path),
+                 lambda: graph.evaluate(session, text, args.batch_size))]:
+            perplexity = evaluate()
+            start = time.time()
+            evaluate()
+            print('%-10s %12.3f %16.0f %12.2f' % (name, startup_time(code, args.num_repeats),
+                                                  (len(text) - 1) / (time.time() - start), perplexity))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the full softmax output layer and cross entropy of a graph run once on the outputs of every unfolding
+# of a window concatenated, as the graphs do, against the output layer run on the output of each unfolding, reporting
+# the time of the forward and backward passes for several vocabulary sizes.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import tensorflow as tf
+
+# Local imports
+from common import build_graph, session_config, time_fetches
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-sizes', default='27,10000,50000')
+    parser.add_argument('--num-unfoldings', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    print('%10s %14s %14s' % ('vocabulary', 'unfolding ms', 'batched ms'))
+    for vocabulary_size in [ int(size) for size in args.vocabulary_sizes.split(',') ]:
+        graph = build_graph(args.model, vocabulary_size, num_unfoldings=args.num_unfoldings,
+                            batch_size=args.batch_size, token_ids_flg=True)
+        with graph._graph.as_default():
+            output_size = int(graph._softmax_weights.get_shape()[0])
+            outputs = [ tf.constant(rng.uniform(0, 1, [args.batch_size, output_size]).astype(np.float32))
+                        for _ in range(args.num_unfoldings) ]
+            labels = tf.constant(rng.randint(0, vocabulary_size, args.num_unfoldings * args.batch_size)
+                                 .astype(np.int32))
+            logits = tf.concat([ graph._output_logits(output) for output in outputs ], 0)
+            costs = [ tf.reduce_mean(tf.nn.sparse_softmax_cross_entropy_with_logits(labels=labels, logits=logits)),
+                      -tf.reduce_mean(graph._log_probs(outputs, labels)) ]
+            fetches = [ tf.gradients(cost, tf.trainable_variables() + outputs) for cost in costs ]
+            fetches = [ [ gradient for gradient in gradients if gradient is not None ] for gradients in fetches ]
+            with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+                session.run(graph._initialization)
+                times = [ time_fetches(session, gradients) for gradients in fetches ]
+        print('%10d %14.1f %14.1f' % (vocabulary_size, times[0], times[1]))
+
+if __name__ == '__main__':
+    main()
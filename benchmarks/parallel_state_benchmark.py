@@ -0,0 +1,43 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the SCRN model with the state vectors of a window computed at once against the SCRN model computing
+# them in the cell, reporting the training and validation throughput for windows of several lengths, with the
+# optimization frequency set to the window length so that each training chunk is a whole window.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vocabulary-size', type=int, default=27)
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-unfoldings', default='10,50,200')
+    parser.add_argument('--while-loop', action='store_true')
+    args = parser.parse_args()
+
+    text = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    split = 9 * len(text) // 10
+    print('%10s %-10s %16s %16s %12s' % ('unfoldings', 'state', 'train tokens/s', 'valid tokens/s', 'perplexity'))
+    for num_unfoldings in [ int(n) for n in args.num_unfoldings.split(',') ]:
+        for parallel_state_flg in [False, True]:
+            graph = build_graph('scrn', args.vocabulary_size, num_unfoldings=num_unfoldings,
+                                optimization_frequency=num_unfoldings, token_ids_flg=True,
+                                while_loop_flg=args.while_loop, parallel_state_flg=parallel_state_flg)
+            training_rate, validation_rate, perplexity = time_epoch(graph, text[:split], text[split:])
+            print('%10d %-10s %16.0f %16.0f %12.2f' % (num_unfoldings, 'parallel' if parallel_state_flg else 'cell',
+                                                       training_rate, validation_rate, perplexity))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the sampled softmax and NCE training objectives against the exact softmax for word-level models,
+# reporting the training throughput and the exact validation perplexity for each word frequency cutoff.  The words are
+# read from a data file when one is given and are drawn from a Zipf distribution otherwise.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+from read_data import read_data_chunks
+from tokens import text_chunks_to_tokens, token_counts
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--filename', default=None)
+    parser.add_argument('--word-frequency-cutoffs', default='50,10,2')
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-sampled', type=int, default=64)
+    parser.add_argument('--num-unfoldings', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+    
+    if args.filename is None:
+        words = [ 'w%d' % word for word in zipf_corpus(10 * args.num_tokens, args.num_tokens) ]
+        text_chunks = [ words ]
+    else:
+        text_chunks = list(read_data_chunks(2, args.filename))
+    
+    print('%6s %10s %-16s %-12s %16s %12s' % ('cutoff', 'vocabulary', 'objective', 'sampler', 'train tokens/s',
+                                              'perplexity'))
+    for word_frequency_cutoff in [ int(cutoff) for cutoff in args.word_frequency_cutoffs.split(',') ]:
+        data, _, _, vocabulary_size = text_chunks_to_tokens(2, text_chunks, word_frequency_cutoff)
+        training_text = data[:9 * len(data) // 10]
+        validation_text = data[9 * len(data) // 10:]
+        counts = token_counts(training_text, vocabulary_size)
+        for training_objective, sampler in [('softmax', '-'), ('sampled_softmax', 'log_uniform'),
+                                            ('sampled_softmax', 'unigram'), ('nce', 'log_uniform'),
+                                            ('nce', 'unigram')]:
+            graph = build_graph(args.model, vocabulary_size, num_unfoldings=args.num_unfoldings,
+                                batch_size=args.batch_size, token_ids_flg=True, token_counts=counts,
+                                training_objective=training_objective, num_sampled=args.num_sampled,
+                                sampler=sampler)
+            training_rate, _, perplexity = time_epoch(graph, training_text, validation_text)
+            print('%6d %10d %-16s %-12s %16.0f %12.1f' % (word_frequency_cutoff, vocabulary_size, training_objective,
+                                                          sampler, training_rate, perplexity))
+
+if __name__ == '__main__':
+    main()
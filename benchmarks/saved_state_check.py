@@ -0,0 +1,84 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Check of the gradients of a training tower, which starts from the state saved in variables and saves its final
+# state once its outputs are computed, against the gradients of the same chunk run from the initial state fed in
+# explicitly, for each model unfolded in the graph and in a symbolic loop.  The gradients only agree if saving the
+# final state does not overwrite the initial state read by the backward pass.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import sys
+import tensorflow as tf
+
+# Local imports
+from common import build_graph, session_config
+
+# Largest absolute difference of the gradients of each variable of the graph from the reference gradients
+def gradient_differences(rnn_name, vocabulary_size, num_unfoldings, batch_size, rng, **graph_options):
+    graph = build_graph(rnn_name, vocabulary_size, hidden_size=16, state_size=6, num_unfoldings=num_unfoldings,
+                        batch_size=batch_size, optimization_frequency=num_unfoldings, token_ids_flg=True,
+                        **graph_options)
+    with graph._graph.as_default():
+        saved_state = graph._training_saved_state(0)
+        state = [ tf.placeholder(tf.float32, shape=saved.get_shape()) for saved in saved_state ]
+        data = graph._training_data[0]
+        if graph._while_loop_flg:
+            outputs, _ = graph._loop(data[:-1], state)
+            outputs, labels = graph._flatten_unfoldings(outputs), graph._flatten_unfoldings(data[1:])
+        else:
+            outputs, _ = graph._unfold(data[:-1], state)
+            outputs, labels = tf.concat(outputs, 0), tf.concat(data[1:], 0)
+        variables = [ variable for _, variable in graph._gradients_and_variables ]
+        gradients = [ tf.convert_to_tensor(gradient) for gradient, _ in graph._gradients_and_variables ]
+        references = [ tf.convert_to_tensor(gradient)
+                       for gradient in tf.gradients(graph._training_cost([outputs], labels), variables) ]
+        chunk = rng.randint(0, vocabulary_size, [num_unfoldings + 1, batch_size]).astype(np.int32)
+        feed_dict = {data: chunk} if graph._while_loop_flg else dict(zip(data, chunk))
+        with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+            session.run(graph._initialization)
+            initial_state = [ rng.uniform(-1, 1, saved.get_shape().as_list()).astype(np.float32)
+                              for saved in saved_state ]
+            for saved, value in zip(saved_state, initial_state):
+                saved.load(value, session)
+            gradient_values = session.run(gradients, feed_dict)
+            feed_dict.update(zip(state, initial_state))
+            reference_values = session.run(references, feed_dict)
+    return [ (variable.op.name.split('/')[0], np.abs(gradient - reference).max())
+             for variable, gradient, reference in zip(variables, gradient_values, reference_values) ]
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', default='lstm,scrn,srn')
+    parser.add_argument('--vocabulary-size', type=int, default=40)
+    parser.add_argument('--num-unfoldings', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    failed = False
+    print('%-6s %-10s %-40s %s' % ('model', 'unfolding', 'largest gradient differences', 'result'))
+    for rnn_name in args.models.split(','):
+        for while_loop_flg in [False, True]:
+            differences = gradient_differences(rnn_name, args.vocabulary_size, args.num_unfoldings, args.batch_size,
+                                               rng, while_loop_flg=while_loop_flg)
+            largest = sorted(differences, key=lambda difference: -difference[1])[:3]
+            ok = all([ difference <= args.tolerance for _, difference in differences ])
+            failed = failed or not ok
+            print('%-6s %-10s %-40s %s' % (rnn_name, 'loop' if while_loop_flg else 'graph',
+                                           ' '.join([ '%s:%.1e' % difference for difference in largest ]),
+                                           'ok' if ok else 'FAILED'))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the class-based hierarchical softmax against the full softmax for word-level models, reporting the
+# training and validation throughput and the validation perplexity for each vocabulary size.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import math
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+from tokens import token_counts
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-sizes', default='2000,10000,50000')
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-unfoldings', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+    
+    print('%-8s %10s %8s %16s %16s %12s' % ('softmax', 'vocabulary', 'classes', 'train tokens/s', 'valid tokens/s',
+                                           'perplexity'))
+    for vocabulary_size in [ int(size) for size in args.vocabulary_sizes.split(',') ]:
+        data = zipf_corpus(vocabulary_size, args.num_tokens)
+        training_text = data[:9 * len(data) // 10]
+        validation_text = data[9 * len(data) // 10:]
+        counts = token_counts(training_text, vocabulary_size)
+        num_classes = int(round(math.sqrt(vocabulary_size)))
+        for softmax_mode in ['full', 'class']:
+            graph = build_graph(args.model, vocabulary_size, num_unfoldings=args.num_unfoldings,
+                                batch_size=args.batch_size, token_ids_flg=True, softmax_mode=softmax_mode,
+                                token_counts=counts, num_classes=num_classes)
+            training_rate, validation_rate, perplexity = time_epoch(graph, training_text, validation_text)
+            print('%-8s %10d %8s %16.0f %16.0f %12.1f' % (softmax_mode, vocabulary_size,
+                                                         num_classes if softmax_mode == 'class' else '-',
+                                                         training_rate, validation_rate, perplexity))
+
+if __name__ == '__main__':
+    main()
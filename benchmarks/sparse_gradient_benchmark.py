@@ -0,0 +1,68 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the gradient and momentum update of the input weights of a graph for a batch of tokens, with the
+# gradients as sparse rows against dense gradients, reporting the time of an update for several vocabulary sizes with
+# one-hot inputs embedded through matrix multiplies or gathered, and with token IDs under lazy momentum or with every
+# row updated.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+import numpy as np
+import tensorflow as tf
+
+# Local imports
+from common import build_graph, session_config, time_fetches
+
+# Input modes as names and graph options
+modes = [ ('one-hot', {}),
+          ('one-hot sparse', {'sparse_gradients_flg': True}),
+          ('ids', {'token_ids_flg': True}),
+          ('ids dense', {'token_ids_flg': True, 'lazy_momentum_flg': False}) ]
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-sizes', default='1000,10000,100000')
+    parser.add_argument('--num-unfoldings', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    num_tokens = args.num_unfoldings * args.batch_size
+    print('%10s %-16s %12s' % ('vocabulary', 'gradients', 'update ms'))
+    for vocabulary_size in [ int(size) for size in args.vocabulary_sizes.split(',') ]:
+        token_ids = rng.randint(0, vocabulary_size, num_tokens).astype(np.int32)
+        for mode_name, graph_options in modes:
+            graph = build_graph(args.model, vocabulary_size, num_unfoldings=args.num_unfoldings,
+                                batch_size=args.batch_size, **graph_options)
+            with graph._graph.as_default():
+                inputs = tf.constant(token_ids)
+                if not graph._token_ids_flg:
+                    inputs = tf.one_hot(inputs, vocabulary_size)
+                weights = [ variable for variable in tf.trainable_variables()
+                            if variable.get_shape().as_list()[0] == vocabulary_size
+                            and len(variable.get_shape()) == 2 ]
+                cost = tf.add_n([ tf.reduce_sum(graph._embed(inputs, variable) *
+                                                tf.constant(rng.uniform(-1, 1, [num_tokens,
+                                                                                int(variable.get_shape()[1])])
+                                                            .astype(np.float32)))
+                                  for variable in weights ])
+                gradients = [ graph._deduplicate_rows(gradient) if isinstance(gradient, tf.IndexedSlices) else gradient
+                              for gradient in tf.gradients(cost, weights) ]
+                update = graph._optimizer.apply_gradients(zip(graph._momentum_gradients(gradients), weights))
+                with tf.Session(graph=graph._graph, config=session_config(graph)) as session:
+                    session.run(tf.global_variables_initializer())
+                    update_time = time_fetches(session, update, {graph._learning_rate: 0.05, graph._momentum: 0.9})
+            print('%10d %-16s %12.1f' % (vocabulary_size, mode_name, update_time))
+
+if __name__ == '__main__':
+    main()
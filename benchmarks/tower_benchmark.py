@@ -0,0 +1,49 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Benchmark of the scaling of data-parallel towers pinned to CPU cores, reporting the training and validation
+# throughput for each number of towers at a fixed batch size across all towers.  The speed-up is bounded by the number
+# of physical cores of the machine.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import argparse
+
+# Local imports
+from common import build_graph, time_epoch, zipf_corpus
+from get_available_devices import cpu_device_config, get_available_cpus
+
+#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='scrn', choices=['lstm', 'scrn', 'srn'])
+    parser.add_argument('--vocabulary-size', type=int, default=2000)
+    parser.add_argument('--num-towers', default='1,2,4,8')
+    parser.add_argument('--num-tokens', type=int, default=200000)
+    parser.add_argument('--num-unfoldings', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+    
+    data = zipf_corpus(args.vocabulary_size, args.num_tokens)
+    training_text = data[:9 * len(data) // 10]
+    validation_text = data[9 * len(data) // 10:]
+    print('%8s %12s %16s %16s %10s' % ('towers', 'tower batch', 'train tokens/s', 'valid tokens/s', 'speed-up'))
+    base_rate = None
+    for num_towers in [ int(n) for n in args.num_towers.split(',') ]:
+        tower_devices = get_available_cpus(cpu_device_config(num_towers))
+        graph = build_graph(args.model, args.vocabulary_size, num_unfoldings=args.num_unfoldings,
+                            batch_size=args.batch_size // num_towers, token_ids_flg=True, tower_devices=tower_devices)
+        training_rate, validation_rate, _ = time_epoch(graph, training_text, validation_text)
+        if base_rate is None:
+            base_rate = training_rate
+        print('%8d %12d %16.0f %16.0f %10.2f' % (num_towers, args.batch_size // num_towers, training_rate,
+                                                 validation_rate, training_rate / base_rate))
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,8 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# This code fails to implement hierarchical softmax at this time as Tensorflow does not appear to include an
-# implementation.  Hierarchical softmax can be included at a future date when hierarchical softmax is available 
-# for Tensorflow.
+# The output layer is either a full softmax over the vocabulary or the class-based hierarchical softmax given in
+# class_softmax.py.
 #
 # Stuart Hagler, 2017
 
@@ -18,15 +17,22 @@ import numpy as np
 import tensorflow as tf
 
 # Local imports
-from batch_generator import batch_generator
-from log_prob import log_prob
+from batch_generator import batch_generator, evaluation_rows
+from batch_prefetcher import batch_prefetcher
+from class_softmax import class_softmax, frequency_binned_classes
+from input_pipeline import input_pipeline
+from model_artifact import write_model_artifact
 
 # Define base RNN TensorFlow graph class
 class base_rnn_graph(object):
     
     # Graph constructor
     def __init__(self, num_gpus, vocabulary_size, num_training_unfoldings, num_validation_unfoldings, training_batch_size,
-                 validation_batch_size, optimization_frequency):
+                 validation_batch_size, optimization_frequency, token_ids_flg=False, input_pipeline_flg=False,
+                 softmax_mode='full', token_counts=None, num_classes=None, training_objective='softmax',
+                 num_sampled=64, sampler='log_uniform', fused_cell_flg=False, while_loop_flg=False, tower_devices=None,
+                 parameter_device=None, hoisted_input_flg=False, sparse_gradients_flg=False,
+                 lazy_momentum_flg=True):
         
         #
         self._display_info_flg = False
@@ -40,15 +46,84 @@ class base_rnn_graph(object):
         self._validation_batch_size = validation_batch_size
         self._vocabulary_size = vocabulary_size
         
+        # Input flags
+        self._token_ids_flg = token_ids_flg     # True to feed integer token IDs through embedding lookups,
+                                                # False to feed dense one-hot vectors through matrix multiplies
+        self._input_pipeline_flg = input_pipeline_flg   # True to build batches in a Tensorflow input pipeline,
+                                                        # False to feed batches through placeholders
+        self._fused_cell_flg = fused_cell_flg   # True to compute each stage of the cell with a single matrix multiply
+                                                # on concatenated weights, False for one matrix multiply per weight
+        self._while_loop_flg = while_loop_flg   # True to run the cell over the unfoldings in a symbolic loop, so that
+                                                # the size of the graph does not depend on the number of unfoldings,
+                                                # False to unfold the cell in the graph
+        self._hoisted_input_flg = hoisted_input_flg   # True to project the inputs of every unfolding of a window
+                                                      # through the input weights at once before running the cell
+                                                      # over the unfoldings, False to project the input in each
+                                                      # unfolding
+        self._sparse_gradients_flg = sparse_gradients_flg   # True to embed one-hot vectors by gathering the rows of
+                                                            # their token IDs, so that the gradients of the input
+                                                            # weights are sparse rows as they are for token IDs, False
+                                                            # to embed them through matrix multiplies
+        self._lazy_momentum_flg = lazy_momentum_flg     # True to update only the rows and momentum of the input
+                                                        # weights for the tokens of a batch when their gradients are
+                                                        # sparse, False to update every row with its decayed momentum
+        
+        # Output layer
+        self._softmax_mode = softmax_mode       # 'full' for a softmax over the whole vocabulary
+                                                # 'class' for a class-based hierarchical softmax with classes binned
+                                                # by the frequencies in token_counts
+        if num_classes is None:
+            num_classes = int(round(math.sqrt(vocabulary_size)))
+        
+        # Training objective, validation and testing always use the exact log-probabilities of the output layer
+        self._training_objective = training_objective   # 'softmax' for the exact cross entropy of the output layer
+                                                        # 'sampled_softmax' for a sampled softmax estimate
+                                                        # 'nce' for noise-contrastive estimation
+        self._num_sampled = min(num_sampled, vocabulary_size - 1)  # Number of tokens sampled per batch for
+                                                                    # 'sampled_softmax' and 'nce'
+        self._sampler = sampler                 # 'log_uniform' for a Zipfian sampler over tokens sorted by frequency
+                                                # 'unigram' for a sampler over the frequencies in token_counts
+        self._token_counts = token_counts
+        if self._softmax_mode not in ['full', 'class']:
+            raise ValueError('Unknown softmax mode: %s' % self._softmax_mode)
+        if self._softmax_mode == 'class' and token_counts is None:
+            raise ValueError('Class softmax needs token_counts')
+        if self._training_objective != 'softmax' and self._softmax_mode != 'full':
+            raise ValueError('Training objective %s needs softmax_mode full' % self._training_objective)
+        if self._training_objective != 'softmax' and self._sampler == 'unigram' and token_counts is None:
+            raise ValueError('Unigram sampler needs token_counts')
+        
+        # Devices, one tower runs on each of the tower devices and the parameters are kept and updated on the
+        # parameter device
+        if tower_devices is None:
+            tower_devices = [ '/gpu:%d' % gpu for gpu in range(self._num_gpus) ]
+            if parameter_device is None:
+                parameter_device = ''
+        elif parameter_device is None:
+            parameter_device = '/cpu:0'
+        self._tower_devices = list(tower_devices)   # Device names such as those from get_available_cpus() or
+                                                    # get_available_gpus()
+        self._parameter_device = parameter_device
+        
         # Derived hyperparameters
-        self._num_towers = self._num_gpus
+        self._num_towers = len(self._tower_devices)
+        
+        # Allreduce across worker processes, set by setup_allreduce when the graph is trained by one of the worker
+        # processes of multiprocess_training.py
+        self._allreduce = None
         
         # Graph definition
         self._graph = tf.Graph()
         with self._graph.as_default():
 
             # Setup tensor structures
-            self._setup_cell_parameters()
+            self._training_pipelines = []
+            self._validation_pipelines = []
+            with tf.device(self._parameter_device):
+                self._setup_cell_parameters()
+                if self._softmax_mode == 'class':
+                    self._class_softmax = class_softmax(int(self._softmax_weights.get_shape()[0]),
+                                                        frequency_binned_classes(token_counts, num_classes))
             self._setup_training_data()
             self._setup_validation_data()
    
@@ -65,18 +140,26 @@ class base_rnn_graph(object):
             # Reset training state
             self._reset_training_state = self._reset_training_state_fun()
                 
-            # Train RNN on training data
-            for i in range(self._num_training_unfoldings // self._optimization_frequency):
-                
-                #
-                logits, labels = self._run_training_rnn(i)
-
-                # Replace with hierarchical softmax in the future
-                self._cost = tf.reduce_mean(tf.nn.softmax_cross_entropy_with_logits(labels=labels, logits=logits))
+            # Train RNN on training data, the graph holds a single chunk of optimization_frequency unfoldings that is
+            # run in order on every chunk of a batch
+            tower_costs = []
+            tower_gradients = []
+            for tower in range(self._num_towers):
+                outputs, labels = self._run_training_rnn(tower)
+                with tf.device(self._tower_devices[tower]):
+                    tower_costs.append(self._training_cost(outputs, labels))
+                    tower_gradients.append(self._optimizer.compute_gradients(tower_costs[tower],
+                                                                             colocate_gradients_with_ops=True))
 
-                gradients, variables = zip(*self._optimizer.compute_gradients(self._cost))
+            # Average the gradients of the towers and apply them once on the parameter device
+            with tf.device(self._parameter_device):
+                self._cost = tf.add_n(tower_costs) / self._num_towers
+                gradients, variables = self._average_gradients(tower_gradients)
+                self._gradients_and_variables = [ (gradient, variable)
+                                                  for gradient, variable in zip(gradients, variables)
+                                                  if gradient is not None ]
                 gradients, _ = tf.clip_by_global_norm(gradients, self._clip_norm)
-                self._optimize = self._optimizer.apply_gradients(zip(gradients, variables))
+                self._optimize = self._optimizer.apply_gradients(zip(self._momentum_gradients(gradients), variables))
 
             # Summarize training performance
             tf.summary.scalar('cost', self._cost)
@@ -91,11 +174,114 @@ class base_rnn_graph(object):
             # Reset validation state
             self._reset_validation_state = self._reset_validation_state_fun()
 
-            # Run RNN on validation data
-            logits = self._run_validation_rnn()
-
-            # Validation prediction, replace with hierarchical softmax in the future
-            self._validation_prediction = tf.nn.softmax(logits)
+            # Run RNN on validation data, with the validation log-probability sum, number of predictions, and
+            # prediction of each tower computed on its device and the prediction only computed for callers that ask
+            # for it
+            tower_log_prob_sums = []
+            tower_counts = []
+            tower_predictions = []
+            for tower in range(self._num_towers):
+                outputs, labels = self._run_validation_rnn(tower)
+                with tf.device(self._tower_devices[tower]):
+                    log_prob_sum, count = self._log_prob_sum(outputs, labels)
+                    tower_log_prob_sums.append(log_prob_sum)
+                    tower_counts.append(count)
+                    tower_predictions.append(self._probabilities(outputs))
+            self._validation_log_prob_sum = tf.add_n(tower_log_prob_sums)
+            self._validation_count = tf.add_n(tower_counts)
+            self._validation_prediction = tf.reshape(tf.concat(tower_predictions, 0),
+                                                     [self._num_towers, self._num_validation_unfoldings,
+                                                      self._validation_batch_size, self._vocabulary_size])
+            
+            # Evaluation:
+            
+            # Run RNN on a batch of token IDs of any size and any number of unfoldings, starting from the state fed in
+            with tf.device(self._tower_devices[0]):
+                self._setup_evaluation()
+                
+            # Inference:
+            
+            # Run one step of the cell on a batch of token IDs of any size, starting from the state fed in
+            with tf.device(self._tower_devices[0]):
+                self._setup_inference()
+                
+            # Generation:
+            
+            # Prime the state of the cell from a batch of prefixes and sample or beam search their continuations in
+            # symbolic loops
+            with tf.device(self._tower_devices[0]):
+                self._setup_generation()
+                
+            # Saver for the parameters of a trained graph
+            self._saver = tf.train.Saver(tf.trainable_variables())
+        
+    # Average the gradients computed by the towers for each variable, with the sparse gradients of embedding lookups
+    # averaged by concatenating their slices
+    def _average_gradients(self, tower_gradients):
+        gradients = []
+        variables = []
+        for gradients_and_variables in zip(*tower_gradients):
+            tower_gradient = [ gradient for gradient, _ in gradients_and_variables ]
+            if tower_gradient[0] is None:
+                gradient = None
+            elif len(tower_gradient) == 1:
+                gradient = tower_gradient[0]
+            elif isinstance(tower_gradient[0], tf.IndexedSlices):
+                gradient = tf.IndexedSlices(tf.concat([ g.values for g in tower_gradient ], 0) / len(tower_gradient),
+                                            tf.concat([ g.indices for g in tower_gradient ], 0),
+                                            tower_gradient[0].dense_shape)
+            else:
+                gradient = tf.add_n(tower_gradient) / len(tower_gradient)
+            if isinstance(gradient, tf.IndexedSlices):
+                gradient = self._deduplicate_rows(gradient)
+            gradients.append(gradient)
+            variables.append(gradients_and_variables[0][1])
+        return gradients, variables
+    
+    # Sum the rows of a sparse gradient with the same index, which come from a token appearing several times in a
+    # batch, so that the global norm of the gradients for clipping is the norm of the gradient and the optimizer reads
+    # and writes each row once
+    def _deduplicate_rows(self, gradient):
+        indices, positions = tf.unique(gradient.indices)
+        return tf.IndexedSlices(tf.unsorted_segment_sum(gradient.values, positions, tf.shape(indices)[0]), indices,
+                                gradient.dense_shape)
+    
+    # Gradient of the rows of a dense gradient that are not zero as a sparse gradient
+    def _nonzero_rows(self, gradient):
+        indices = tf.reshape(tf.where(tf.reduce_any(tf.not_equal(gradient, 0), 1)), [-1])
+        return tf.IndexedSlices(tf.gather(gradient, indices), indices, tf.shape(gradient, out_type=tf.int64))
+    
+    # Gradients to apply with the momentum optimizer, which updates only the rows of a sparse gradient and their
+    # momentum, so sparse gradients are made dense to update every row unless momentum is lazy
+    def _momentum_gradients(self, gradients):
+        if self._lazy_momentum_flg:
+            return gradients
+        return [ tf.convert_to_tensor(gradient) if isinstance(gradient, tf.IndexedSlices) else gradient
+                 for gradient in gradients ]
+        
+    # Attach the allreduce of a worker process and add the operations to exchange the gradients of the worker with the
+    # other workers, the gradients of the towers of the worker are fetched as dense arrays and the gradients averaged
+    # across the workers are fed back to be clipped and applied.  The averaged gradients of the variables with sparse
+    # gradients are applied as the rows that are not zero, so that lazy momentum updates the same rows as in a single
+    # process.
+    def setup_allreduce(self, allreduce):
+        self._allreduce = allreduce
+        with self._graph.as_default(), tf.device(self._parameter_device):
+            self._exchanged_gradients = [ tf.convert_to_tensor(gradient)
+                                          for gradient, _ in self._gradients_and_variables ]
+            self._averaged_gradients = [ tf.placeholder(tf.float32, shape=variable.get_shape())
+                                         for _, variable in self._gradients_and_variables ]
+            gradients = [ self._nonzero_rows(averaged) if isinstance(gradient, tf.IndexedSlices) else averaged
+                          for averaged, (gradient, _) in zip(self._averaged_gradients, self._gradients_and_variables) ]
+            gradients, _ = tf.clip_by_global_norm(gradients, self._clip_norm)
+            self._apply_averaged_gradients = self._optimizer.apply_gradients(
+                zip(self._momentum_gradients(gradients), [ variable for _, variable in self._gradients_and_variables ]))
+            self._parameters = tf.trainable_variables()
+        
+    # Number of parameters of the graph
+    def num_parameters(self):
+        with self._graph.as_default():
+            return int(sum([ np.prod(variable.get_shape().as_list()) for variable in tf.trainable_variables() ]))
         
     # Function to add choice of optimizer
     def _add_optimizer(self, optimizer, learning_rate, momentum):
@@ -107,7 +293,151 @@ class base_rnn_graph(object):
     # Placeholder function for cell definition
     def _cell(self):
         print('Cell not defined')
+    
+    # Placeholder function to project the input of one unfolding, or of several unfoldings stacked along the first
+    # dimension, through the input weights of the cell
+    def _input_projection(self, x):
+        print('Input projection not defined')
+    
+    # Placeholder function for the cell given the input projected by _input_projection
+    def _projected_cell(self):
+        print('Projected cell not defined')
+        
+    # Project a batch of input tokens, or several unfoldings of batches stacked along the first dimension, through a
+    # vocabulary-sized weight tensor, using an embedding lookup for token IDs and a matrix multiply for one-hot vectors
+    # unless the gradients are sparse
+    def _embed(self, x, W):
+        if self._token_ids_flg:
+            return tf.nn.embedding_lookup(W, x)
+        elif self._sparse_gradients_flg:
+            return tf.nn.embedding_lookup(W, tf.argmax(x, -1, output_type=tf.int32))
+        elif x.get_shape().ndims == 2:
+            return tf.matmul(x, W)
+        else:
+            return tf.tensordot(x, W, 1)
+        
+    # Input tensors for the num_unfoldings + 1 unfoldings of a batch, or for the chunk_size + 1 unfoldings of each
+    # chunk of a batch when chunk_size is given, either read from a new input pipeline that is added to pipelines or
+    # fed through placeholders.  In while loop mode the input is a single tensor with the unfoldings stacked along the
+    # first dimension.
+    def _input_data(self, batch_size, num_unfoldings, pipelines, chunk_size=None):
+        if self._input_pipeline_flg:
+            pipelines.append(input_pipeline(batch_size, num_unfoldings, self._vocabulary_size, self._token_ids_flg,
+                                            chunk_size=chunk_size))
+            if self._while_loop_flg:
+                return pipelines[-1].next_window()
+            else:
+                return pipelines[-1].next_batch()
+        if chunk_size is None:
+            chunk_size = num_unfoldings
+        if self._while_loop_flg:
+            return self._input_placeholder([chunk_size + 1, batch_size])
+        else:
+            return [ self._input_placeholder([batch_size]) for _ in range(chunk_size + 1) ]
+        
+    # Placeholder for input tokens of the given shape
+    def _input_placeholder(self, shape):
+        if self._token_ids_flg:
+            return tf.placeholder(tf.int32, shape=shape)
+        else:
+            return tf.placeholder(tf.float32, shape=shape + [self._vocabulary_size])
+        
+    # Token IDs of a batch of labels
+    def _label_ids(self, labels):
+        if self._token_ids_flg:
+            return labels
+        else:
+            return tf.argmax(labels, 1, output_type=tf.int32)
+        
+    # Natural log-probabilities of the labels given the outputs of the cell for a list of unfoldings, with the output
+    # layer run once on the outputs of every unfolding concatenated
+    def _log_probs(self, outputs, labels):
+        if self._softmax_mode == 'class':
+            return self._class_softmax.log_prob(tf.concat(outputs, 0), self._label_ids(labels), self._softmax_weights,
+                                                self._softmax_bias)
+        logits = self._output_logits(tf.concat(outputs, 0))
+        if self._token_ids_flg:
+            return -tf.nn.sparse_softmax_cross_entropy_with_logits(labels=labels, logits=logits)
+        else:
+            return -tf.nn.softmax_cross_entropy_with_logits(labels=labels, logits=logits)
+        
+    # Sample of the vocabulary shared by the labels of a batch for the sampled softmax and NCE objectives
+    def _sampled_values(self, labels):
+        if self._sampler == 'log_uniform':
+            return tf.nn.log_uniform_candidate_sampler(labels, 1, self._num_sampled, True, self._vocabulary_size)
+        elif self._sampler == 'unigram':
+            return tf.nn.fixed_unigram_candidate_sampler(labels, 1, self._num_sampled, True, self._vocabulary_size,
+                                                         unigrams=[ float(count) for count in self._token_counts ])
+        raise ValueError('Unknown sampler: %s' % self._sampler)
+    
+    # Training cost for a list of unfoldings, either the exact cross entropy of the output layer or an estimate of it
+    # from a sample of the vocabulary
+    def _training_cost(self, outputs, labels):
+        if self._training_objective == 'softmax':
+            return -tf.reduce_mean(self._log_probs(outputs, labels))
+        inputs = tf.concat(outputs, 0)
+        labels = tf.expand_dims(tf.cast(self._label_ids(labels), tf.int64), 1)
+        weights = self._sampled_softmax_weights
+        if self._softmax_bias is not None:
+            biases = self._softmax_bias
+        else:
+            biases = tf.zeros([self._vocabulary_size])
+        sampled_values = self._sampled_values(labels)
+        if self._training_objective == 'sampled_softmax':
+            loss = tf.nn.sampled_softmax_loss(weights, biases, labels, inputs, self._num_sampled,
+                                              self._vocabulary_size, sampled_values=sampled_values,
+                                              remove_accidental_hits=True)
+        elif self._training_objective == 'nce':
+            loss = tf.nn.nce_loss(weights, biases, labels, inputs, self._num_sampled, self._vocabulary_size,
+                                  sampled_values=sampled_values)
+        else:
+            raise ValueError('Unknown training objective: %s' % self._training_objective)
+        return tf.reduce_mean(loss)
+        
+    # Sum of the base 2 log-probabilities of the labels given the outputs of the cell and the number of labels, with
+    # probabilities clamped below at 1e-10 and only the labels where the mask is 1 counted when there is a mask
+    def _log_prob_sum(self, outputs, labels, mask=None):
+        log_prob = tf.maximum(self._log_probs(outputs, labels), math.log(1e-10)) / math.log(2)
+        if mask is None:
+            return tf.reduce_sum(log_prob), tf.size(log_prob)
+        return tf.reduce_sum(log_prob * mask), tf.reduce_sum(mask)
+    
+    # Output weights over the vocabulary acting on outputs of output_size, a variable of shape (output_size,
+    # vocabulary_size) for the softmax objective.  For a sampled objective they are the transpose of a variable of shape
+    # (vocabulary_size, output_size) kept as the sampled softmax weights, from which the rows of the true and sampled
+    # tokens are gathered, so that the gradients of the output weights are sparse rows.
+    def _output_weights(self, output_size):
+        if self._training_objective == 'softmax':
+            return tf.Variable(tf.truncated_normal([output_size, self._vocabulary_size], -0.1, 0.1))
+        self._sampled_softmax_weights = tf.Variable(tf.truncated_normal([self._vocabulary_size, output_size], -0.1,
+                                                                        0.1))
+        return tf.transpose(self._sampled_softmax_weights)
+    
+    # Logits over the whole vocabulary for a batch of outputs of the cell
+    def _output_logits(self, output):
+        logits = tf.matmul(output, self._softmax_weights)
+        if self._softmax_bias is not None:
+            logits += self._softmax_bias
+        return logits
+    
+    # Natural log-probabilities over the whole vocabulary given the outputs of the cell for a list of unfoldings
+    def _log_probabilities(self, outputs):
+        if self._softmax_mode == 'class':
+            return self._class_softmax.log_probabilities(tf.concat(outputs, 0), self._softmax_weights,
+                                                         self._softmax_bias)
+        return tf.nn.log_softmax(self._output_logits(tf.concat(outputs, 0)))
+    
+    # Probabilities over the whole vocabulary given the outputs of the cell for a list of unfoldings
+    def _probabilities(self, outputs):
+        if self._softmax_mode == 'class':
+            return self._class_softmax.probabilities(tf.concat(outputs, 0), self._softmax_weights, self._softmax_bias)
+        return tf.nn.softmax(self._output_logits(tf.concat(outputs, 0)))
         
+    # Flatten a tensor of outputs or labels with the unfoldings stacked along the first dimension into a tensor with
+    # the batches of each unfolding concatenated, as they are in the unfolded graph
+    def _flatten_unfoldings(self, x):
+        return tf.reshape(x, [-1] + x.get_shape().as_list()[2:])
+    
     # Placeholder function to reset training state       
     def _reset_training_state_fun(self):
         print('Training state reset not defined')
@@ -116,34 +446,268 @@ class base_rnn_graph(object):
     def _reset_validation_state_fun(self):
         print('Validation state reset not defined')
         
-    #
-    def _run_training_rnn(self, i):
-        training_labels = []
-        training_outputs = []
-        for tower in range(self._num_towers):
-            training_labels.append([])
-            training_outputs.append([])
-        for tower in range(self._num_towers):
-            training_outputs[tower], training_labels[tower] = self._training_tower(i, tower, tower)
-        all_training_outputs = []
-        all_training_labels = []
-        for tower in range(self._num_towers):
-            all_training_outputs += training_outputs[tower]
-            all_training_labels += training_labels[tower]
-        logits = tf.concat(all_training_outputs, 0)
-        labels = tf.concat(all_training_labels, 0)
-        return logits, labels
+    # Outputs and labels of a tower for a chunk of training data
+    def _run_training_rnn(self, tower):
+        if self._while_loop_flg:
+            outputs, labels = self._training_loop_tower(tower, tower)
+        else:
+            outputs, labels = self._training_tower(tower, tower)
+        return outputs, tf.concat(labels, 0)
 
-    #
-    def _run_validation_rnn(self):
-        validation_outputs = []
-        for tower in range(self._num_towers):
-            validation_outputs.append([])
-        for tower in range(self._num_towers):
-            validation_outputs[tower] = self._validation_tower(tower,tower)
-        logits = validation_outputs
-        return logits
+    # Outputs and labels of a tower for a batch of validation data
+    def _run_validation_rnn(self, tower):
+        if self._while_loop_flg:
+            outputs, labels = self._validation_loop_tower(tower, tower)
+        else:
+            outputs = self._validation_tower(tower, tower)
+            labels = self._validation_input[tower][1:]
+        return outputs, tf.concat(labels, 0)
+    
+    # Run the cell over a list of unfoldings of the input from a list of state tensors and return the list of outputs and
+    # the final state, with the inputs of every unfolding projected at once in hoisted input mode
+    def _unfold(self, inputs, state):
+        outputs = []
+        if self._hoisted_input_flg:
+            for input_arg in tf.unstack(self._input_projection(tf.stack(inputs))):
+                output, state = self._projected_step(input_arg, state)
+                outputs.append(output)
+        else:
+            for x in inputs:
+                output, state = self._step(x, state)
+                outputs.append(output)
+        return outputs, state
+    
+    # Run the cell over the unfoldings stacked along the first dimension of inputs in a symbolic loop, starting from
+    # a list of initial state tensors, and return the outputs stacked along the first dimension and the final state,
+    # with the inputs of every unfolding projected at once before the loop in hoisted input mode
+    def _loop(self, inputs, initial_state):
+        num_unfoldings = tf.shape(inputs)[0]
+        if self._hoisted_input_flg:
+            input_args = tf.TensorArray(tf.float32, size=num_unfoldings).unstack(self._input_projection(inputs))
+            step = lambda i, state: self._projected_step(input_args.read(i), state)
+        else:
+            step = lambda i, state: self._step(inputs[i], state)
+        def body(i, state, outputs):
+            output, state = step(i, state)
+            return i + 1, state, outputs.write(i, output)
+        _, state, outputs = tf.while_loop(lambda i, state, outputs: i < num_unfoldings, body,
+                                          [tf.constant(0), initial_state,
+                                           tf.TensorArray(tf.float32, size=num_unfoldings)])
+        return outputs.stack(), state
+    
+    # Run the cell over the unfoldings stacked along the first dimension of inputs in a symbolic loop, starting from
+    # the state saved in the saved_state variables, and return the outputs stacked along the first dimension once the
+    # final state is saved.  The saved state variables are resource variables, so that saving the final state does not
+    # overwrite the initial state read by the backward pass of the loop.
+    def _run_loop(self, inputs, saved_state):
+        outputs, state = self._loop(inputs, [ tf.identity(saved) for saved in saved_state ])
+        with tf.control_dependencies([outputs]):
+            save_state = [ saved.assign(final) for saved, final in zip(saved_state, state) ]
+        with tf.control_dependencies(save_state):
+            return tf.identity(outputs)
+    
+    # Evaluation graph, which shares the parameters of the training and validation graphs but has dynamic batch and time
+    # dimensions and takes its initial state from placeholders and returns its final state instead of keeping the state
+    # in variables.  The input is a tensor of token IDs of shape (num_unfoldings + 1, batch_size) in any mode, and the
+    # mask of shape (num_unfoldings, batch_size) is 1 for the labels that are scored.
+    def _setup_evaluation(self):
+        self._evaluation_input = tf.placeholder(tf.int32, shape=[None, None])
+        self._evaluation_mask = tf.placeholder(tf.float32, shape=[None, None])
+        self._evaluation_state = self._state_placeholders()
+        inputs = self._token_inputs(self._evaluation_input)
+        outputs, self._evaluation_final_state = self._loop(inputs[:-1], self._evaluation_state)
+        self._evaluation_log_prob_sum, self._evaluation_count = \
+            self._log_prob_sum([ self._flatten_unfoldings(outputs) ], self._flatten_unfoldings(inputs[1:]),
+                               tf.reshape(self._evaluation_mask, [-1]))
+    
+    # Inference graph, which shares the parameters of the training graph and runs a single step of the cell on a batch
+    # of token IDs of any size from the state fed in, and returns the probabilities of the next token and the new state
+    def _setup_inference(self):
+        self._inference_input = tf.placeholder(tf.int32, shape=[None])
+        self._inference_state = self._state_placeholders()
+        output, self._inference_final_state = self._step(self._token_inputs(self._inference_input),
+                                                         self._inference_state)
+        self._inference_probabilities = self._probabilities([output])
+    
+    # Generation graph, which shares the parameters of the training graph and primes the state of the cell from a batch
+    # of prefixes of token IDs of shape (prefix_size, batch_size), and then either samples a continuation of each
+    # prefix or beam searches beam_width continuations of each prefix, each in a single symbolic loop
+    def _setup_generation(self):
+        self._generation_prefix = tf.placeholder(tf.int32, shape=[None, None])
+        self._generation_length = tf.placeholder(tf.int32, shape=[])
+        self._generation_temperature = tf.placeholder_with_default(1.0, shape=[])
+        self._generation_top_k = tf.placeholder_with_default(0, shape=[])
+        self._beam_width = tf.placeholder_with_default(1, shape=[])
+        batch_size = tf.shape(self._generation_prefix)[1]
+        zero_state = [ tf.zeros([batch_size, int(saved.get_shape()[1])]) for saved in self._validation_saved_state(0) ]
+        _, state = self._loop(self._token_inputs(self._generation_prefix[:-1]), zero_state)
+        self._sampled_tokens = self._sample_loop(self._generation_prefix[-1], state)
+        self._beam_tokens, self._beam_parents, self._beam_scores = \
+            self._beam_search_loop(self._generation_prefix[-1], state)
+    
+    # Sample generation_length tokens in a symbolic loop starting from the last token IDs of the prefixes and the
+    # primed state, with the logits divided by the temperature and limited to the top_k most probable tokens when top_k
+    # is positive, and return the sampled token IDs stacked along the first dimension
+    def _sample_loop(self, token_ids, state):
+        def body(i, token_ids, state, tokens):
+            output, state = self._step(self._token_inputs(token_ids), state)
+            token_ids = self._sample_tokens(self._log_probabilities([output]) / self._generation_temperature,
+                                            self._generation_top_k)
+            return i + 1, token_ids, state, tokens.write(i, token_ids)
+        _, _, _, tokens = tf.while_loop(lambda i, token_ids, state, tokens: i < self._generation_length, body,
+                                        [tf.constant(0), token_ids, state,
+                                         tf.TensorArray(tf.int32, size=self._generation_length)])
+        return tokens.stack()
+    
+    # Sample a token ID from the logits of each row, only among the top_k largest logits when top_k is positive, in
+    # which case the sample is drawn from the top_k logits alone rather than from logits masked over the whole
+    # vocabulary, and without sorting the logits otherwise
+    def _sample_tokens(self, logits, top_k):
+        def sample_top_k():
+            top_logits, top_token_ids = tf.nn.top_k(logits, tf.minimum(top_k, self._vocabulary_size))
+            return tf.batch_gather(top_token_ids, tf.multinomial(top_logits, 1, output_dtype=tf.int32))[:, 0]
+        return tf.cond(top_k > 0, sample_top_k, lambda: tf.multinomial(logits, 1, output_dtype=tf.int32)[:, 0])
+    
+    # Beam search generation_length tokens in a symbolic loop starting from the last token IDs of the prefixes and the
+    # primed state, keeping the beam_width continuations of each prefix with the largest sum of natural
+    # log-probabilities, and return the token IDs and parent beams of each step stacked along the first dimension with
+    # shape (generation_length, batch_size, beam_width) and the final scores of the beams
+    def _beam_search_loop(self, token_ids, state):
+        batch_size = tf.shape(token_ids)[0]
+        beam_width = self._beam_width
+        
+        # Copy the last token and the state of each prefix to each of its beams, with only the first beam live at the
+        # start so that the beams do not all repeat it
+        token_ids = tf.reshape(tf.tile(token_ids[:, None], [1, beam_width]), [-1])
+        state = [ tf.reshape(tf.tile(tensor[:, None], [1, beam_width, 1]), [-1, int(tensor.get_shape()[1])])
+                  for tensor in state ]
+        scores = tf.tile(tf.concat([tf.zeros([1]), tf.fill([beam_width - 1], -np.inf)], 0)[None], [batch_size, 1])
+        beam_offsets = tf.range(batch_size)[:, None] * beam_width
+        
+        # Extend every beam by every token and keep the best beam_width extensions of the beams of each prefix
+        def body(i, token_ids, state, scores, tokens, parents):
+            output, state = self._step(self._token_inputs(token_ids), state)
+            log_probs = tf.reshape(self._log_probabilities([output]), [batch_size, beam_width, self._vocabulary_size])
+            scores, indices = tf.nn.top_k(tf.reshape(scores[:, :, None] + log_probs,
+                                                     [batch_size, beam_width * self._vocabulary_size]), beam_width)
+            beam_parents = indices // self._vocabulary_size
+            beam_tokens = indices % self._vocabulary_size
+            state = [ tf.gather(tensor, tf.reshape(beam_parents + beam_offsets, [-1])) for tensor in state ]
+            return (i + 1, tf.reshape(beam_tokens, [-1]), state, scores, tokens.write(i, beam_tokens),
+                    parents.write(i, beam_parents))
+        _, _, _, scores, tokens, parents = \
+            tf.while_loop(lambda i, token_ids, state, scores, tokens, parents: i < self._generation_length, body,
+                          [tf.constant(0), token_ids, state, scores,
+                           tf.TensorArray(tf.int32, size=self._generation_length),
+                           tf.TensorArray(tf.int32, size=self._generation_length)])
+        return tokens.stack(), parents.stack(), scores
     
+    # Sample a continuation of length tokens for each of a batch of prefixes of token IDs of the same size, returned as
+    # an array of token IDs of shape (batch_size, length)
+    def generate(self, session, prefixes, length, temperature=1.0, top_k=0):
+        generation_feed_dict = dict()
+        generation_feed_dict[self._generation_prefix] = np.asarray(prefixes, dtype=np.int32).T
+        generation_feed_dict[self._generation_length] = length
+        generation_feed_dict[self._generation_temperature] = temperature
+        generation_feed_dict[self._generation_top_k] = top_k
+        return session.run(self._sampled_tokens, feed_dict=generation_feed_dict).T
+    
+    # Beam search beam_width continuations of length tokens for each of a batch of prefixes of token IDs of the same
+    # size, returned as an array of token IDs of shape (batch_size, beam_width, length) and the natural
+    # log-probabilities of the continuations of shape (batch_size, beam_width), with the beams of each prefix ordered
+    # from the most probable.  The continuations are read back from the parent beams of each step after the loop.
+    def beam_search(self, session, prefixes, length, beam_width):
+        generation_feed_dict = dict()
+        generation_feed_dict[self._generation_prefix] = np.asarray(prefixes, dtype=np.int32).T
+        generation_feed_dict[self._generation_length] = length
+        generation_feed_dict[self._beam_width] = beam_width
+        tokens, parents, scores = session.run([self._beam_tokens, self._beam_parents, self._beam_scores],
+                                              feed_dict=generation_feed_dict)
+        beams = np.tile(np.arange(beam_width), [len(scores), 1])
+        continuations = np.zeros([len(scores), beam_width, length], dtype=np.int32)
+        for i in reversed(range(length)):
+            continuations[:, :, i] = np.take_along_axis(tokens[i], beams, 1)
+            beams = np.take_along_axis(parents[i], beams, 1)
+        return continuations, scores
+    
+    # Placeholders for a list of state tensors with a dynamic batch dimension, shaped like the saved validation state
+    def _state_placeholders(self):
+        return [ tf.placeholder(tf.float32, shape=[None, saved.get_shape()[1]])
+                 for saved in self._validation_saved_state(0) ]
+    
+    # Zero state arrays for a batch of size batch_size to feed to a list of state placeholders
+    def _zero_state(self, state_placeholders, batch_size):
+        return [ np.zeros([batch_size, int(placeholder.get_shape()[1])], dtype=np.float32)
+                 for placeholder in state_placeholders ]
+    
+    # Inputs of the cell for a tensor of token IDs, which are converted to one-hot vectors when the graph does not
+    # take token IDs
+    def _token_inputs(self, token_ids):
+        if self._token_ids_flg:
+            return token_ids
+        else:
+            return tf.one_hot(token_ids, self._vocabulary_size)
+    
+    # Run one step of the cell on a batch of token IDs from a list of state arrays and return the probabilities of the
+    # next token and the new state
+    def predict(self, session, token_ids, state):
+        inference_feed_dict = dict(zip(self._inference_state, state))
+        inference_feed_dict[self._inference_input] = token_ids
+        return session.run([self._inference_probabilities, self._inference_final_state],
+                           feed_dict=inference_feed_dict)
+    
+    # Restore the parameters of a trained graph saved by train
+    def restore(self, session, checkpoint_path):
+        self._saver.restore(session, checkpoint_path)
+    
+    # Export the parameters of the cell and the output layer, the hyperparameters, and the dictionary of tokens to token
+    # IDs to a model artifact in the directory path for the NumPy engine in numpy_engine.py, with the parameters of a
+    # fused cell exported as the parameters of the unfused cell
+    def export(self, session, path, dictionary=None):
+        parameters = self._exported_parameters()
+        arrays = dict(zip(parameters.keys(), session.run(list(parameters.values()))))
+        hyperparameters = self._exported_hyperparameters()
+        hyperparameters['vocabulary_size'] = self._vocabulary_size
+        if self._softmax_mode == 'class':
+            arrays['class_W'], arrays['class_b'], arrays['token_classes'] = \
+                session.run([self._class_softmax._class_weights, self._class_softmax._class_bias,
+                             self._class_softmax._token_classes])
+        write_model_artifact(path, arrays, hyperparameters, dictionary)
+    
+    # Placeholder function to list the exported cell and output layer parameters by name
+    def _exported_parameters(self):
+        print('Exported parameters not defined')
+    
+    # Placeholder function to list the exported hyperparameters by name
+    def _exported_hyperparameters(self):
+        print('Exported hyperparameters not defined')
+    
+    # Perplexity of a whole text, including the tail that the batch generator drops.  The text is split into
+    # batch_size rows of nearly equal length, which overlap by one token so that every token but the first is scored
+    # exactly once, and the rows are run num_unfoldings at a time with the state of each row carried from one window
+    # to the next.  The last window may be shorter and the labels past the end of the shorter rows are masked out.
+    def evaluate(self, session, text, batch_size, num_unfoldings=None):
+        if num_unfoldings is None:
+            num_unfoldings = self._num_validation_unfoldings
+        text_matrix, mask = evaluation_rows(text, batch_size)
+        batch_size, row_size = mask.shape
+        state = self._zero_state(self._evaluation_state, batch_size)
+        log_prob_sum = 0
+        N = 0
+        for start in range(0, row_size, num_unfoldings):
+            end = min(start + num_unfoldings, row_size)
+            evaluation_feed_dict = dict(zip(self._evaluation_state, state))
+            evaluation_feed_dict[self._evaluation_input] = text_matrix[:, start:end + 1].T
+            evaluation_feed_dict[self._evaluation_mask] = mask[:, start:end].T
+            batch_log_prob_sum, batch_count, state = session.run([self._evaluation_log_prob_sum, self._evaluation_count,
+                                                                  self._evaluation_final_state],
+                                                                 feed_dict=evaluation_feed_dict)
+            log_prob_sum += float(batch_log_prob_sum)
+            N += float(batch_count)
+        if self._allreduce is not None:
+            log_prob_sum, N = self._allreduce.sum([log_prob_sum, N])
+        return float(2 ** (-log_prob_sum / N))
+        
     # Placeholder function to set up cell parameters
     def _setup_cell_parameters(self):
         print('Cell parameters not defined')  
@@ -167,101 +731,192 @@ class base_rnn_graph(object):
         # Iterate over training batches
         for tower in range(self._num_towers):
             training_batches[tower].reset_token_idx()
+            if self._input_pipeline_flg:
+                self._training_pipelines[tower].initialize(session, training_batches[tower].text_matrix())
         session.run(self._reset_training_state)
         for batch in range(training_batches[0].num_batches()):
 
             # Get next training batch
             training_batches_next = []
             tower = 0
-            for tower in range(self._num_towers):
-                training_batches_next.append([])
-                training_batches_next[tower] = training_batches[tower].next()
+            if not self._input_pipeline_flg:
+                for tower in range(self._num_towers):
+                    training_batches_next.append([])
+                    training_batches_next[tower] = training_batches[tower].next()
             batch_ctr += 1
 
             # Optimization
             training_feed_dict[self._clip_norm] = clip_norm
             training_feed_dict[self._learning_rate] = learning_rate
             training_feed_dict[self._momentum] = momentum
-            for tower in range(self._num_towers):
-                for i in range(self._num_training_unfoldings + 1):
-                    training_feed_dict[self._training_data[tower][i]] = training_batches_next[tower][i]
-            _, summary = session.run([self._optimize, self._training_summary], feed_dict=training_feed_dict)
+            for i in range(self._num_training_unfoldings // self._optimization_frequency):
+                for tower in range(len(training_batches_next)):
+                    chunk = training_batches_next[tower][i*self._optimization_frequency:
+                                                         (i+1)*self._optimization_frequency + 1]
+                    if self._while_loop_flg:
+                        training_feed_dict[self._training_data[tower]] = chunk
+                    else:
+                        for j in range(self._optimization_frequency + 1):
+                            training_feed_dict[self._training_data[tower][j]] = chunk[j]
+                summary, cst = self._optimization_step(session, training_feed_dict)
 
             # Summarize current performance
-            training_writer.add_summary(summary, epoch * training_batches[0].num_batches() + batch)
+            if training_writer is not None:
+                training_writer.add_summary(summary, epoch * training_batches[0].num_batches() + batch)
 
             if self._display_info_flg:
                 if (batch+1) % summary_frequency == 0:
-                    cst = session.run(self._cost, feed_dict=training_feed_dict)
                     print('     Total Batches: %d  Current Batch: %d  Cost: %.2f' % 
                           (batch_ctr, batch+1, cst))
         
-    # Placeholder function to implement a tower to run part of a batch of training data on a GPU
-    def _training_tower(self, i, tower, gpu):
+    # Run one optimization step on a chunk of training data and return the training summary and cost, with the gradients
+    # averaged across the worker processes before they are applied when there is an allreduce
+    def _optimization_step(self, session, training_feed_dict):
+        if self._allreduce is None:
+            _, summary, cst = session.run([self._optimize, self._training_summary, self._cost],
+                                          feed_dict=training_feed_dict)
+            return summary, cst
+        gradients, summary, cst = session.run([self._exchanged_gradients, self._training_summary, self._cost],
+                                              feed_dict=training_feed_dict)
+        optimization_feed_dict = dict(zip(self._averaged_gradients, self._allreduce.mean(gradients)))
+        for placeholder in [self._clip_norm, self._learning_rate, self._momentum]:
+            optimization_feed_dict[placeholder] = training_feed_dict[placeholder]
+        session.run(self._apply_averaged_gradients, feed_dict=optimization_feed_dict)
+        return summary, cst
+        
+    # Copy the parameters of the first worker process to the other workers
+    def _broadcast_parameters(self, session):
+        for parameter, value in zip(self._parameters,
+                                    self._allreduce.broadcast(session.run(self._parameters))):
+            parameter.load(value, session)
+        
+    # Placeholder function to run one unfolding of the cell on a list of saved state tensors
+    def _step(self, x, state):
+        print('Step not defined')
+        
+    # Placeholder function to implement a tower to run part of a chunk of training data on a device
+    def _training_tower(self, tower, device):
         print('Training tower not defined')
         
+    # Implements a tower to run part of a chunk of training data on a device in a symbolic loop
+    def _training_loop_tower(self, tower, device):
+        with tf.device(self._tower_devices[device]):
+            inputs = self._training_data[tower]
+            outputs = self._run_loop(inputs[:-1], self._training_saved_state(tower))
+            return [ self._flatten_unfoldings(outputs) ], [ self._flatten_unfoldings(inputs[1:]) ]
+        
+    # Placeholder function to list the saved training state variables of a tower
+    def _training_saved_state(self, tower):
+        print('Training saved state not defined')
+        
     #
     def _validation_step(self, session, learning_rate, learning_decay, momentum, clip_norm, 
-                         validation_batches, validation_writer):
+                         validation_batches, validation_writer, predictions_flg=False):
         
         #
         validation_feed_dict = dict()
+        validation_fetches = [self._validation_log_prob_sum, self._validation_count]
+        if predictions_flg:
+            validation_fetches.append(self._validation_prediction)
+            validation_predictions = []
     
         # Iterate over validation batches
         for tower in range(self._num_towers):
             validation_batches[tower].reset_token_idx()
+            if self._input_pipeline_flg:
+                self._validation_pipelines[tower].initialize(session, validation_batches[tower].text_matrix())
         session.run(self._reset_validation_state)
         validation_log_prob_sum = 0
+        N = 0
         for _ in range(validation_batches[0].num_batches()):
 
             # Get next validation batch
             validation_batches_next = []
             tower = 0
-            for tower in range(self._num_towers):
-                validation_batches_next.append([])
-                validation_batches_next[tower] = validation_batches[tower].next()
+            if not self._input_pipeline_flg:
+                for tower in range(self._num_towers):
+                    validation_batches_next.append([])
+                    validation_batches_next[tower] = validation_batches[tower].next()
 
             # Validation
-            validation_batches_next_label = []
-            for tower in range(self._num_towers):
-                validation_batches_next_label_tmp = []
-                for i in range(self._num_validation_unfoldings):
-                    validation_feed_dict[self._validation_input[tower][i]] = validation_batches_next[tower][i]
-                    validation_batches_next_label_tmp.append(validation_batches_next[tower][i+1])
-                validation_batches_next_label.append(validation_batches_next_label_tmp)
-            validation_prediction = session.run(self._validation_prediction, feed_dict=validation_feed_dict)
+            for tower in range(len(validation_batches_next)):
+                if self._while_loop_flg:
+                    validation_feed_dict[self._validation_input[tower]] = validation_batches_next[tower]
+                else:
+                    for i in range(self._num_validation_unfoldings + 1):
+                        validation_feed_dict[self._validation_input[tower][i]] = validation_batches_next[tower][i]
+            validation_results = session.run(validation_fetches, feed_dict=validation_feed_dict)
 
             # Summarize current performance
-            for tower in range(self._num_towers):
-                for i in range(self._num_validation_unfoldings):
-                    for j in range(self._validation_batch_size):
-                        validation_log_prob_sum = validation_log_prob_sum + \
-                            log_prob(validation_prediction[tower][i][j], validation_batches_next_label[tower][i][j])
+            validation_log_prob_sum += float(validation_results[0])
+            N += int(validation_results[1])
+            if predictions_flg:
+                validation_predictions.append(validation_results[2])
 
-        # Calculation validation perplexity
-        N = self._num_towers * self._num_validation_unfoldings * \
-            validation_batches[0].num_batches() * self._validation_batch_size
+        # Calculation validation perplexity, over the validation data of every worker process when there is an allreduce
+        if self._allreduce is not None:
+            validation_log_prob_sum, N = self._allreduce.sum([validation_log_prob_sum, N])
         perplexity = float(2 ** (-validation_log_prob_sum / N))
         
         #
+        if predictions_flg:
+            return perplexity, validation_predictions
         return perplexity
         
-    # Placeholder function to implement a tower to run part of a batch of validation data on a GPU
-    def _validation_tower(self, tower, gpu):
+    # Placeholder function to implement a tower to run part of a batch of validation data on a device
+    def _validation_tower(self, tower, device):
         print('Validation tower not defined')
+        
+    # Implements a tower to run part of a batch of validation data on a device in a symbolic loop
+    def _validation_loop_tower(self, tower, device):
+        with tf.device(self._tower_devices[device]):
+            inputs = self._validation_input[tower]
+            outputs = self._run_loop(inputs[:-1], self._validation_saved_state(tower))
+            return [ self._flatten_unfoldings(outputs) ], [ self._flatten_unfoldings(inputs[1:]) ]
+        
+    # Placeholder function to list the saved validation state variables of a tower
+    def _validation_saved_state(self, tower):
+        print('Validation saved state not defined')
+            
+    # Session configuration with as many CPU devices as the tower and parameter devices name, and soft placement so
+    # that the default GPU towers fall back to the CPU on machines without GPUs
+    def _session_config(self):
+        config = tf.ConfigProto()
+        config.allow_soft_placement = True
+        config.gpu_options.allow_growth = True
+        config.log_device_placement = True
+        if self._allreduce is not None:
+            config.log_device_placement = False
+            config.intra_op_parallelism_threads = self._allreduce.num_threads()
+            config.inter_op_parallelism_threads = self._allreduce.num_threads()
+        device_specs = [ tf.DeviceSpec.from_string(device)
+                         for device in self._tower_devices + [self._parameter_device] ]
+        cpu_indices = [ spec.device_index or 0 for spec in device_specs if spec.device_type == 'CPU' ]
+        if cpu_indices:
+            config.device_count['CPU'] = max(cpu_indices) + 1
+        return config
+            
+    # Generate the batches for one tower, prefetched in a background thread when prefetch_depth > 0 and the batches are
+    # fed through placeholders
+    def _batch_generator(self, tower, text, batch_size, num_unfoldings, prefetch_depth):
+        batches = batch_generator(self._display_info_flg, tower, text, batch_size, num_unfoldings, self._vocabulary_size,
+                                  self._token_ids_flg, True)
+        if prefetch_depth > 0 and not self._input_pipeline_flg:
+            batches = batch_prefetcher(batches, prefetch_depth)
+        return batches
             
     # Train model parameters
     def train(self, learning_rate, learning_decay, momentum, clip_norm, num_epochs, summary_frequency, training_text,
-              validation_text, testing_text, logdir):
+              validation_text, testing_text, logdir, prefetch_depth=2, evaluation_batch_size=None,
+              checkpoint_path=None):
 
         # Generate training batches
         if self._display_info_flg:
             print('Training Batch Generator:')
         training_batches = []
         for tower in range(self._num_towers):
-            training_batches.append(batch_generator(self._display_info_flg, tower, training_text[tower],
-                                                    self._training_batch_size, self._num_training_unfoldings,
-                                                    self._vocabulary_size))
+            training_batches.append(self._batch_generator(tower, training_text[tower], self._training_batch_size,
+                                                          self._num_training_unfoldings, prefetch_depth))
         
         # Generate validation batches
         if self._display_info_flg:
@@ -269,9 +924,8 @@ class base_rnn_graph(object):
         validation_batches = []
         tower = 0
         for tower in range(self._num_towers):
-            validation_batches.append(batch_generator(self._display_info_flg, tower, validation_text[tower],
-                                                      self._validation_batch_size, self._num_validation_unfoldings,
-                                                      self._vocabulary_size))
+            validation_batches.append(self._batch_generator(tower, validation_text[tower], self._validation_batch_size,
+                                                            self._num_validation_unfoldings, prefetch_depth))
             
         # Generate testing batches
         if self._display_info_flg:
@@ -279,26 +933,33 @@ class base_rnn_graph(object):
         testing_batches = []
         tower = 0
         for tower in range(self._num_towers):
-            testing_batches.append(batch_generator(self._display_info_flg, tower, validation_text[tower],
-                                                   self._validation_batch_size, self._num_validation_unfoldings,
-                                                   self._vocabulary_size))
+            testing_batches.append(self._batch_generator(tower, testing_text[tower], self._validation_batch_size,
+                                                         self._num_validation_unfoldings, prefetch_depth))
         
         # Training loop
         epoch_ctr = 0
         
-        config = tf.ConfigProto()
-        config.gpu_options.allow_growth = True
-        config.log_device_placement = True
-        with tf.Session(graph=self._graph, config=config) as session:
+        # Only the first worker process reports when there is an allreduce
+        chief_flg = self._allreduce is None or self._allreduce.rank() == 0
+        
+        with tf.Session(graph=self._graph, config=self._session_config()) as session:
             
             # Create summary writers
-            training_writer = tf.summary.FileWriter(logdir + 'training/', graph=tf.get_default_graph())
-            validation_writer = tf.summary.FileWriter(logdir + 'validation/', graph=tf.get_default_graph())
-            testing_writer = tf.summary.FileWriter(logdir + 'testing/', graph=tf.get_default_graph())
+            if chief_flg:
+                training_writer = tf.summary.FileWriter(logdir + 'training/', graph=tf.get_default_graph())
+                validation_writer = tf.summary.FileWriter(logdir + 'validation/', graph=tf.get_default_graph())
+                testing_writer = tf.summary.FileWriter(logdir + 'testing/', graph=tf.get_default_graph())
+            else:
+                training_writer = None
+                validation_writer = None
+                testing_writer = None
         
             # Initialize
             session.run(self._initialization)
-            print('Initialized')
+            if self._allreduce is not None:
+                self._broadcast_parameters(session)
+            if chief_flg:
+                print('Initialized')
 
             # Iterate over fixed number of training epochs
             for epoch in range(num_epochs):
@@ -311,15 +972,24 @@ class base_rnn_graph(object):
                 # Validation Step:
                 perplexity = self._validation_step(session, learning_rate, learning_decay, momentum, 
                                                    clip_norm, validation_batches, validation_writer)
-                print('Epoch: %d  LearningRate:  %.2f  Validation Set Perplexity: %.2f' % \
-                      (epoch+1, learning_rate, perplexity))
+                if chief_flg:
+                    print('Epoch: %d  LearningRate:  %.2f  Validation Set Perplexity: %.2f' % \
+                          (epoch+1, learning_rate, perplexity))
 
                 # Update learning rate
                 if epoch > 0 and perplexity > perplexity_last_epoch:
                     learning_rate *= learning_decay
                 perplexity_last_epoch = perplexity
                 
-            # Testing Step:
-            perplexity = self._validation_step(session, learning_rate, learning_decay, momentum, 
-                                               clip_norm, testing_batches, testing_writer)
-            print('Testing Set Perplexity: %.2f' % perplexity)
\ No newline at end of file
+            # Testing Step, over the whole testing text with the evaluation graph when evaluation_batch_size is given:
+            if evaluation_batch_size is None:
+                perplexity = self._validation_step(session, learning_rate, learning_decay, momentum, 
+                                                   clip_norm, testing_batches, testing_writer)
+            else:
+                perplexity = self.evaluate(session, np.concatenate(testing_text), evaluation_batch_size)
+            if chief_flg:
+                print('Testing Set Perplexity: %.2f' % perplexity)
+                
+            # Save the trained parameters
+            if chief_flg and checkpoint_path is not None:
+                self._saver.save(session, checkpoint_path)
\ No newline at end of file
@@ -6,28 +6,24 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# This code fails to implement hierarchical softmax at this time as Tensorflow does not appear to include an
-# implementation.  Hierarchical softmax can be included at a future date when hierarchical softmax is available 
-# for Tensorflow.
+# The output layer is either a full softmax over the vocabulary or the class-based hierarchical softmax given in
+# class_softmax.py.
 #
 # Stuart Hagler, 2017
 
 # Imports
-import math
-import numpy as np
 import tensorflow as tf
 
 # Local imports
 from base_rnn_graph import base_rnn_graph
-from batch_generator import batch_generator
-from log_prob import log_prob
 
 # Define derived RNN TensorFlow graph class with saved hidden and state vectors
 class base_rnn_graph3(base_rnn_graph):
     
     # Graph constructor
     def __init__(self, num_gpus, hidden_size, state_size, vocabulary_size, num_training_unfoldings,
-                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency):
+                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency,
+                 **kwargs):
         
         # Input hyperparameters
         self._hidden_size = hidden_size
@@ -35,7 +31,7 @@ class base_rnn_graph3(base_rnn_graph):
         
         #
         base_rnn_graph.__init__(self, num_gpus, vocabulary_size, num_training_unfoldings, num_validation_unfoldings,
-                                training_batch_size, validation_batch_size, optimization_frequency)
+                                training_batch_size, validation_batch_size, optimization_frequency, **kwargs)
             
     #        
     def _reset_training_state_fun(self):
@@ -56,74 +52,89 @@ class base_rnn_graph3(base_rnn_graph):
         self._training_data = []
         self._training_hidden_saved = []
         self._training_state_saved = []
-        for _ in range(self._num_towers):
-            training_data_tmp = []
-            for _ in range(self._num_training_unfoldings + 1):
-                training_data_tmp.append(tf.placeholder(tf.float32, shape=[self._training_batch_size,
-                                                                           self._vocabulary_size]))
-            self._training_data.append(training_data_tmp)
-            self._training_hidden_saved.append(tf.Variable(tf.zeros([self._training_batch_size, self._hidden_size]),
-                                                           trainable=False))
-            self._training_state_saved.append(tf.Variable(tf.zeros([self._training_batch_size, self._state_size]),
-                                                          trainable=False))
+        for tower in range(self._num_towers):
+            self._training_data.append(self._input_data(self._training_batch_size, self._num_training_unfoldings,
+                                                        self._training_pipelines, self._optimization_frequency))
+            with tf.device(self._tower_devices[tower]):
+                self._training_hidden_saved.append(tf.Variable(tf.zeros([self._training_batch_size, self._hidden_size]),
+                                                               trainable=False, use_resource=True))
+                self._training_state_saved.append(tf.Variable(tf.zeros([self._training_batch_size, self._state_size]),
+                                                              trainable=False, use_resource=True))
             
     #
     def _setup_validation_data(self):
         self._validation_input = []
         self._validation_hidden_saved = []
         self._validation_state_saved = []
-        for _ in range(self._num_towers):
-            validation_input_tmp = []
-            for _ in range(self._num_validation_unfoldings):
-                validation_input_tmp.append(tf.placeholder(tf.float32, shape=[self._validation_batch_size,
-                                                                              self._vocabulary_size]))
-            self._validation_input.append(validation_input_tmp)
-            self._validation_hidden_saved.append(tf.Variable(tf.zeros([self._validation_batch_size, self._hidden_size]),
-                                                             trainable=False))
-            self._validation_state_saved.append(tf.Variable(tf.zeros([self._validation_batch_size, self._state_size]),
-                                                            trainable=False))
+        for tower in range(self._num_towers):
+            self._validation_input.append(self._input_data(self._validation_batch_size, self._num_validation_unfoldings,
+                                                           self._validation_pipelines))
+            with tf.device(self._tower_devices[tower]):
+                self._validation_hidden_saved.append(tf.Variable(tf.zeros([self._validation_batch_size,
+                                                                           self._hidden_size]),
+                                                                 trainable=False, use_resource=True))
+                self._validation_state_saved.append(tf.Variable(tf.zeros([self._validation_batch_size,
+                                                                          self._state_size]),
+                                                                trainable=False, use_resource=True))
             
-    # Implements a tower to run part of a batch of training data on a GPU
-    def _training_tower(self, i, tower, gpu):
+    # Run one unfolding of the cell on the saved hidden and state vectors
+    def _step(self, x, state):
+        output, hidden, state = self._cell(x, *state)
+        return output, [hidden, state]
+    
+    # Run one unfolding of the cell on the saved hidden and state vectors given the projected input
+    def _projected_step(self, input_arg, state):
+        output, hidden, state = self._projected_cell(input_arg, *state)
+        return output, [hidden, state]
+    
+    #
+    def _training_saved_state(self, tower):
+        return [self._training_hidden_saved[tower], self._training_state_saved[tower]]
+    
+    #
+    def _validation_saved_state(self, tower):
+        return [self._validation_hidden_saved[tower], self._validation_state_saved[tower]]
+    
+    # Implements a tower to run part of a chunk of training data on a device
+    def _training_tower(self, tower, device):
         
-        with tf.device("/gpu:%d" % gpu):
+        with tf.device(self._tower_devices[device]):
    
             # Get saved training state
             hidden = self._training_hidden_saved[tower]
             state = self._training_state_saved[tower]
 
             # Run training data through cell
-            labels = []
-            outputs = []
-            for j in range(self._optimization_frequency):
-                x = self._training_data[tower][i*self._optimization_frequency + j]
-                label = self._training_data[tower][i*self._optimization_frequency + j + 1]
-                output, hidden, state = self._cell(x, hidden, state)
-                labels.append(label)
-                outputs.append(output)
+            labels = self._training_data[tower][1:self._optimization_frequency + 1]
+            outputs, [hidden, state] = self._unfold(self._training_data[tower][:self._optimization_frequency],
+                                                    [hidden, state])
 
-            # Save training state and return training outputs
-            with tf.control_dependencies([self._training_hidden_saved[tower].assign(hidden), 
-                                          self._training_state_saved[tower].assign(state)]):
-                return outputs, labels
+            # Save training state once the outputs are computed and return the training outputs of every unfolding
+            # concatenated once the state is saved.  The saved state is a resource variable, so the assign writes a new
+            # buffer when the backward pass still holds the initial state it read.
+            with tf.control_dependencies(outputs):
+                save_state = [self._training_hidden_saved[tower].assign(hidden), 
+                              self._training_state_saved[tower].assign(state)]
+            with tf.control_dependencies(save_state):
+                return [ tf.identity(tf.concat(outputs, 0)) ], labels
         
-    # Implements a tower to run part of a batch of validation data on a GPU
-    def _validation_tower(self, tower, gpu):
+    # Implements a tower to run part of a batch of validation data on a device
+    def _validation_tower(self, tower, device):
         
-        with tf.device("/gpu:%d" % gpu):
+        with tf.device(self._tower_devices[device]):
         
             # Get saved validation state
             hidden = self._validation_hidden_saved[tower]
             state = self._validation_state_saved[tower]
 
             # Run validation data through cell
-            outputs = []
-            for i in range(self._num_validation_unfoldings):
-                x = self._validation_input[tower][i]
-                output, hidden, state = self._cell(x, hidden, state)
-                outputs.append(output)
+            outputs, [hidden, state] = self._unfold(self._validation_input[tower][:self._num_validation_unfoldings],
+                                                    [hidden, state])
 
-            # Save validation state and return validation outputs
-            with tf.control_dependencies([self._validation_hidden_saved[tower].assign(hidden), 
-                                          self._validation_state_saved[tower].assign(state)]):
-                return outputs
\ No newline at end of file
+            # Save validation state once the outputs are computed and return the validation outputs of every
+            # unfolding concatenated once the state is saved
+            with tf.control_dependencies(outputs):
+                save_state = [self._validation_hidden_saved[tower].assign(hidden), 
+                              self._validation_state_saved[tower].assign(state)]
+            with tf.control_dependencies(save_state):
+                return [ tf.identity(tf.concat(outputs, 0)) ]
@@ -17,11 +17,14 @@ import numpy as np
 class batch_generator(object):
     
     #
-    def __init__(self, display_info_flg, tower, text, batch_size, num_unfoldings, vocabulary_size):
+    def __init__(self, display_info_flg, tower, text, batch_size, num_unfoldings, vocabulary_size, token_ids_flg=False,
+                 vectorized_flg=False):
         
         #
         self._batch_size = batch_size
         self._num_unfoldings = num_unfoldings
+        self._token_ids_flg = token_ids_flg
+        self._vectorized_flg = vectorized_flg
         self._vocabulary_size = vocabulary_size
         
         #
@@ -29,18 +32,23 @@ class batch_generator(object):
         self._dropped_text_size = len(text) % self._effective_batch_size
         self._text_size = len(text) - self._dropped_text_size
         self._text = text[:self._text_size]
+        if self._token_ids_flg or self._vectorized_flg:
+            if not isinstance(self._text, np.ndarray):
+                self._text = np.asarray(self._text, dtype=np.int32)
         self._text_size = len(self._text)
         
+        # Each row of the batch reads its own contiguous subtext, and consecutive batches overlap by one token so
+        # that the last label of one batch is the first input of the next
         self._sub_text_size = self._text_size // self._batch_size
-        self._num_batches = self._sub_text_size // self._num_unfoldings
-        self._offsets = [ i * self._sub_text_size for i in range(self._batch_size) ]
-        self._cursor = [ offset * self._sub_text_size for offset in range(batch_size)]
+        self._num_batches = max(self._sub_text_size - 1, 0) // self._num_unfoldings
+        self._offsets = np.arange(self._batch_size) * self._sub_text_size
         
-        #
-        self._token_idx = 0
+        # Vectorized mode views the text once as a (batch_size, sub_text_size) matrix whose columns are batches
+        if self._vectorized_flg:
+            self._text_matrix = self._text.reshape(self._batch_size, self._sub_text_size)
         
         #
-        self._last_batch = self._next_batch()
+        self.reset_token_idx()
         
         #
         if display_info_flg:
@@ -54,15 +62,36 @@ class batch_generator(object):
         
     def _next_batch(self):
         
-        # Generate a batch starting with token at self._first_token_idx
-        batch = np.zeros(shape=(self._batch_size, self._vocabulary_size), dtype=np.float)
-        for i in range(self._batch_size):
-            batch[i, self._text[self._offsets[i] + self._token_idx]] = 1.0
+        # Generate a batch starting with token at self._first_token_idx, either as int32 token IDs of shape
+        # (batch_size,) or as one-hot vectors of shape (batch_size, vocabulary_size)
+        if self._token_ids_flg:
+            batch = self._text[self._offsets + self._token_idx].astype(np.int32, copy=False)
+        else:
+            batch = np.zeros(shape=(self._batch_size, self._vocabulary_size), dtype=np.float32)
+            for i in range(self._batch_size):
+                batch[i, self._text[self._offsets[i] + self._token_idx]] = 1.0
         self._token_idx += 1
         return batch
   
+    def _next_window(self):
+        
+        # Slice the num_unfoldings + 1 columns of the next batch out of the text matrix without copying and build
+        # all of its timesteps in one operation, as an array of shape (num_unfoldings + 1, batch_size) of int32
+        # token IDs or (num_unfoldings + 1, batch_size, vocabulary_size) of one-hot vectors
+        window = self._text_matrix[:, self._token_idx:self._token_idx + self._num_unfoldings + 1].T
+        self._token_idx += self._num_unfoldings
+        if self._token_ids_flg:
+            return window.astype(np.int32, copy=False)
+        batches = np.zeros(shape=window.shape + (self._vocabulary_size,), dtype=np.float32)
+        np.put_along_axis(batches, window[:, :, np.newaxis], 1.0, axis=2)
+        return batches
+  
     def next(self):
 
+        #
+        if self._vectorized_flg:
+            return self._next_window()
+        
         #
         batches = [self._last_batch]
         for step in range(self._num_unfoldings):
@@ -73,5 +102,26 @@ class batch_generator(object):
     def num_batches(self):
         return self._num_batches
     
+    def text_matrix(self):
+        return self._text_matrix
+    
     def reset_token_idx(self):
-        self._token_idx = 0
\ No newline at end of file
+        self._token_idx = 0
+        if not self._vectorized_flg:
+            self._last_batch = self._next_batch()
+
+# Split a whole text into batch_size rows of nearly equal length that overlap by one token, so that every token but the
+# first is a label exactly once, and return the token matrix of shape (batch_size, row_size + 1), padded at the end of
+# the shorter rows, and the mask of shape (batch_size, row_size) that is 1 for the labels in the text
+def evaluation_rows(text, batch_size):
+    text = np.asarray(text, dtype=np.int32)
+    num_labels = len(text) - 1
+    if num_labels < 1:
+        raise ValueError('Need a text of at least two tokens to evaluate')
+    batch_size = min(batch_size, num_labels)
+    row_starts = np.linspace(0, num_labels, batch_size + 1).astype(np.int64)
+    row_sizes = np.diff(row_starts)
+    row_size = int(row_sizes.max())
+    text_matrix = text[np.minimum(row_starts[:-1, None] + np.arange(row_size + 1), num_labels)]
+    mask = (np.arange(row_size) < row_sizes[:, None]).astype(np.float32)
+    return text_matrix, mask
\ No newline at end of file
@@ -0,0 +1,80 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# The batch prefetcher class that wraps a batch generator and builds its batches in a background thread, so that the
+# next batch is prepared while the LSTM, SCRN, and SRN models run on the current one.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import queue
+import threading
+
+#
+class batch_prefetcher(object):
+
+    #
+    def __init__(self, batches, prefetch_depth):
+
+        #
+        self._batches = batches
+        self._prefetch_depth = prefetch_depth
+
+        #
+        self._queue = None
+        self._stop_event = None
+        self._thread = None
+
+    # Put an item on the queue, waiting for space until the pass is stopped
+    def _put(self, batch_queue, stop_event, item):
+        while not stop_event.is_set():
+            try:
+                batch_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # Fill the queue with the batches of one pass over the text, holding at most prefetch_depth batches at a time, and
+    # pass any exception raised by the batch generator on to the consumer
+    def _fill_queue(self, batch_queue, stop_event):
+        try:
+            for _ in range(self._batches.num_batches()):
+                if not self._put(batch_queue, stop_event, self._batches.next()):
+                    return
+        except Exception as e:
+            self._put(batch_queue, stop_event, e)
+
+    # Stop the thread filling the queue for the current pass, if any
+    def _stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def next(self):
+        batch = self._queue.get()
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+    def num_batches(self):
+        return self._batches.num_batches()
+
+    # Start a new pass over the text in a new background thread
+    def reset_token_idx(self):
+        self._stop()
+        self._batches.reset_token_idx()
+        self._queue = queue.Queue(maxsize=self._prefetch_depth)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._fill_queue, args=(self._queue, self._stop_event))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def text_matrix(self):
+        return self._batches.text_matrix()
@@ -0,0 +1,124 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# A two-level class-based hierarchical softmax output layer for the LSTM, SCRN, and SRN models.  Tokens are assigned to
+# classes binned by frequency as in Mikolov et al. 2011, the probability of a token is the probability of its class
+# times the probability of the token within its class, and training only needs the output weights of the tokens in the
+# class of each label instead of the whole vocabulary.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import numpy as np
+import tensorflow as tf
+
+# Assign tokens to num_classes classes so that each class covers about the same share of the token counts, with the
+# most frequent tokens in the smallest classes, and number the classes that are not empty consecutively
+def frequency_binned_classes(token_counts, num_classes):
+    token_counts = np.asarray(token_counts, dtype=np.float64)
+    order = np.argsort(-token_counts, kind='stable')
+    cumulative_share = np.cumsum(token_counts[order]) - token_counts[order]
+    cumulative_share /= max(token_counts.sum(), 1)
+    sorted_classes = np.minimum((cumulative_share * num_classes).astype(np.int64), num_classes - 1)
+    token_classes = np.zeros(len(token_counts), dtype=np.int32)
+    token_classes[order] = np.unique(sorted_classes, return_inverse=True)[1]
+    return token_classes
+
+#
+class class_softmax(object):
+
+    # The token_classes array gives the class of each token in the vocabulary
+    def __init__(self, input_size, token_classes):
+
+        #
+        token_classes = np.asarray(token_classes, dtype=np.int32)
+        self._num_classes = int(token_classes.max()) + 1
+        class_sizes = np.bincount(token_classes, minlength=self._num_classes)
+
+        # Order of the tokens sorted by class, range of each class in that order, and position of each token within its
+        # class.  The token IDs generated by text_elements_to_tokens are sorted by frequency, so that the tokens are
+        # usually in class order already and the output weights do not need to be reordered.
+        token_order = np.argsort(token_classes, kind='stable').astype(np.int32)
+        self._class_ends = np.cumsum(class_sizes)
+        self._class_starts = self._class_ends - class_sizes
+        token_positions = np.zeros(len(token_classes), dtype=np.int32)
+        token_positions[token_order] = np.arange(len(token_classes)) - self._class_starts[token_classes[token_order]]
+        if np.array_equal(token_order, np.arange(len(token_classes))):
+            self._token_order = None
+        else:
+            self._token_order = tf.constant(token_order)
+            self._inverse_token_order = tf.constant(np.argsort(token_order).astype(np.int32))
+        self._token_classes = tf.constant(token_classes)
+        self._token_positions = tf.constant(token_positions)
+
+        # Class softmax weight tensor and bias.
+        with tf.name_scope('Class_W'):
+            self._class_weights = tf.Variable(tf.truncated_normal([input_size, self._num_classes], -0.1, 0.1))
+        with tf.name_scope('Class_b'):
+            self._class_bias = tf.Variable(tf.zeros([self._num_classes]))
+
+    # Logits of the classes given the inputs
+    def _class_logits(self, inputs):
+        return tf.matmul(inputs, self._class_weights) + self._class_bias
+
+    # Output weights and bias of the tokens of each class, split once so that their gradients are concatenated
+    # rather than each padded out to the whole vocabulary
+    def _class_output_layers(self, weights, bias):
+        if self._token_order is not None:
+            weights = tf.gather(weights, self._token_order, axis=1)
+            if bias is not None:
+                bias = tf.gather(bias, self._token_order)
+        class_sizes = list(self._class_ends - self._class_starts)
+        class_weights = tf.split(weights, class_sizes, 1)
+        if bias is None:
+            class_biases = [ None ] * self._num_classes
+        else:
+            class_biases = tf.split(bias, class_sizes, 0)
+        return class_weights, class_biases
+
+    # Logits of the tokens of a class given the inputs
+    def _member_logits(self, inputs, weights, bias):
+        logits = tf.matmul(inputs, weights)
+        if bias is not None:
+            logits += bias
+        return logits
+
+    # Natural log-probabilities of the label tokens given the inputs, where the inputs are partitioned by the classes
+    # of their labels so that each input only meets the output weights of the tokens in the class of its label
+    def log_prob(self, inputs, labels, weights, bias):
+        classes = tf.gather(self._token_classes, labels)
+        class_log_prob = -tf.nn.sparse_softmax_cross_entropy_with_logits(labels=classes,
+                                                                         logits=self._class_logits(inputs))
+        class_weights, class_biases = self._class_output_layers(weights, bias)
+        indices = tf.dynamic_partition(tf.range(tf.shape(labels)[0]), classes, self._num_classes)
+        class_inputs = tf.dynamic_partition(inputs, classes, self._num_classes)
+        class_positions = tf.dynamic_partition(tf.gather(self._token_positions, labels), classes, self._num_classes)
+        token_log_probs = []
+        for c in range(self._num_classes):
+            logits = self._member_logits(class_inputs[c], class_weights[c], class_biases[c])
+            token_log_probs.append(-tf.nn.sparse_softmax_cross_entropy_with_logits(labels=class_positions[c],
+                                                                                   logits=logits))
+        return class_log_prob + tf.dynamic_stitch(indices, token_log_probs)
+
+    # Natural log-probabilities of every token in the vocabulary given the inputs, which needs the full output
+    # projection
+    def log_probabilities(self, inputs, weights, bias):
+        class_weights, class_biases = self._class_output_layers(weights, bias)
+        class_log_probs = tf.nn.log_softmax(self._class_logits(inputs))
+        log_probs = []
+        for c in range(self._num_classes):
+            log_probs.append(class_log_probs[:, c:c+1] +
+                             tf.nn.log_softmax(self._member_logits(inputs, class_weights[c], class_biases[c])))
+        log_probs = tf.concat(log_probs, 1)
+        if self._token_order is not None:
+            log_probs = tf.gather(log_probs, self._inverse_token_order, axis=1)
+        return log_probs
+
+    # Probabilities of every token in the vocabulary given the inputs
+    def probabilities(self, inputs, weights, bias):
+        return tf.exp(self.log_probabilities(inputs, weights, bias))
@@ -0,0 +1,74 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# A persistent cache of the tokens and dictionary generated from a data file for the LSTM, SCRN, and SRN models.  The
+# tokens are stored as a .npy file that is memory-mapped on later runs, so that the data file does not need to be
+# read and tokenized again and the training, validation, and testing sets can be taken as slices of the memory map.
+#
+# Stuart Hagler, 2017
+
+# usecase_flg = 1 for predicting letters
+#               2 for predicting words with cutoff for infrequent words
+
+# Imports
+import hashlib
+import json
+import numpy as np
+import os
+
+# Local imports
+from read_data import read_data_chunks
+from tokens import text_chunks_to_tokens
+
+# Hash the contents of the data file in blocks, or the names and contents of the files of a directory of shards
+def _file_hash(filename, file_hash=None):
+    if file_hash is None:
+        file_hash = hashlib.sha1()
+    if os.path.isdir(filename):
+        for name in sorted(os.listdir(filename)):
+            file_hash.update(name.encode('utf-8'))
+            _file_hash(os.path.join(filename, name), file_hash)
+    else:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                file_hash.update(block)
+    return file_hash.hexdigest()
+
+# Path prefix of the cache entry for a data file, usecase, and word frequency cutoff
+def _cache_prefix(usecase_flg, filename, word_frequency_cutoff, cache_dir):
+    key = '%s_%d_%d' % (_file_hash(filename), usecase_flg, word_frequency_cutoff)
+    return os.path.join(cache_dir, key)
+
+# Write the tokens and dictionary for a data file to the cache
+def _write_cache(prefix, data, dictionary, vocabulary_size):
+    if vocabulary_size <= np.iinfo(np.uint8).max + 1:
+        dtype = np.uint8
+    else:
+        dtype = np.int32
+    with open(prefix + '.npy.tmp', 'wb') as f:
+        np.save(f, np.asarray(data, dtype=dtype))
+    with open(prefix + '.json.tmp', 'w') as f:
+        json.dump({'dictionary': dictionary, 'vocabulary_size': vocabulary_size}, f)
+    os.replace(prefix + '.npy.tmp', prefix + '.npy')
+    os.replace(prefix + '.json.tmp', prefix + '.json')
+
+# Read tokens and dictionary for a data file from the cache, generating and caching them on the first run
+def read_cached_tokens(usecase_flg, filename, word_frequency_cutoff, cache_dir):
+    prefix = _cache_prefix(usecase_flg, filename, word_frequency_cutoff, cache_dir)
+    if not (os.path.exists(prefix + '.npy') and os.path.exists(prefix + '.json')):
+        os.makedirs(cache_dir, exist_ok=True)
+        text_chunks = read_data_chunks(usecase_flg, filename)
+        data, dictionary, _, vocabulary_size = text_chunks_to_tokens(usecase_flg, text_chunks, word_frequency_cutoff)
+        _write_cache(prefix, data, dictionary, vocabulary_size)
+        del data
+    data = np.load(prefix + '.npy', mmap_mode='r')
+    with open(prefix + '.json') as f:
+        cache_info = json.load(f)
+    dictionary = cache_info['dictionary']
+    reverse_dictionary = dict(zip(dictionary.values(), dictionary.keys()))
+    return data, dictionary, reverse_dictionary, cache_info['vocabulary_size']
@@ -1,9 +1,13 @@
+import tensorflow as tf
 from tensorflow.python.client import device_lib
 
-def get_available_cpus():
-    local_device_protos = device_lib.list_local_devices()
+def cpu_device_config(num_cpus):
+    return tf.ConfigProto(device_count={'CPU': num_cpus})
+
+def get_available_cpus(config=None):
+    local_device_protos = device_lib.list_local_devices(config)
     return [x.name for x in local_device_protos if x.device_type == 'CPU']
 
-def get_available_gpus():
-    local_device_protos = device_lib.list_local_devices()
+def get_available_gpus(config=None):
+    local_device_protos = device_lib.list_local_devices(config)
     return [x.name for x in local_device_protos if x.device_type == 'GPU']
\ No newline at end of file
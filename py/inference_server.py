@@ -0,0 +1,165 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# The inference server class that serves next-token predictions of a trained LSTM, SCRN, or SRN model to many streams
+# of tokens at once.  The server keeps the state of the cell for each stream, collects the concurrent requests of
+# different streams into micro-batches, and runs each micro-batch through a single step of the cell in a background
+# thread.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import asyncio
+import collections
+import concurrent.futures
+import numpy as np
+import queue
+import threading
+import time
+
+# Request for the probabilities of the next token of a stream given its next token ID
+_request = collections.namedtuple('_request', ['stream_id', 'token_id', 'future'])
+
+#
+class inference_server(object):
+
+    # The server runs the graph in session, which has either been initialized or had trained parameters restored, with
+    # at most max_batch_size requests in a micro-batch and waiting at most max_wait seconds after the first request of
+    # a micro-batch for more requests
+    def __init__(self, graph, session, max_batch_size=64, max_wait=0.002):
+
+        #
+        self._graph = graph
+        self._session = session
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+
+        # State of the cell for each stream, as a list with an array for each state tensor
+        self._states = dict()
+        self._states_lock = threading.Lock()
+
+        # Requests waiting for a micro-batch, and requests put off to a later micro-batch since the micro-batch being
+        # collected already has a request of their stream
+        self._requests = queue.Queue()
+        self._deferred_requests = collections.deque()
+
+        #
+        self._num_batches = 0
+        self._num_requests = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # Collect the requests of the next micro-batch, at most one request for each stream so that the requests of a
+    # stream run in order
+    def _next_batch(self):
+        batch = []
+        stream_ids = set()
+        deferred_requests = collections.deque()
+        def add(request):
+            if request.stream_id in stream_ids or len(batch) == self._max_batch_size:
+                deferred_requests.append(request)
+            else:
+                batch.append(request)
+                stream_ids.add(request.stream_id)
+        while self._deferred_requests:
+            add(self._deferred_requests.popleft())
+        if not batch:
+            try:
+                add(self._requests.get(timeout=0.1))
+            except queue.Empty:
+                pass
+        if batch:
+            deadline = time.time() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                try:
+                    timeout = deadline - time.time()
+                    if timeout > 0:
+                        add(self._requests.get(timeout=timeout))
+                    else:
+                        add(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+        self._deferred_requests = deferred_requests
+        return [ request for request in batch if request.future.set_running_or_notify_cancel() ]
+
+    # Run a micro-batch through one step of the cell, starting each new stream from the zero state
+    def _run_batch(self, batch):
+        with self._states_lock:
+            states = [ self._states.get(request.stream_id) for request in batch ]
+        zero_state = [ state[0] for state in self._graph._zero_state(self._graph._inference_state, 1) ]
+        state = [ np.stack([ zero_state[k] if stream_state is None else stream_state[k]
+                             for stream_state in states ])
+                  for k in range(len(zero_state)) ]
+        token_ids = np.array([ request.token_id for request in batch ], dtype=np.int32)
+        try:
+            probabilities, state = self._graph.predict(self._session, token_ids, state)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        with self._states_lock:
+            for i, request in enumerate(batch):
+                self._states[request.stream_id] = [ stream_state[i].copy() for stream_state in state ]
+        for i, request in enumerate(batch):
+            request.future.set_result(probabilities[i])
+        self._num_batches += 1
+        self._num_requests += len(batch)
+
+    # Serve micro-batches until the server is stopped
+    def _serve(self):
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._run_batch(batch)
+
+    # Start serving in a background thread
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    # Stop serving and fail the requests that have not been served
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        requests = list(self._deferred_requests)
+        self._deferred_requests.clear()
+        while True:
+            try:
+                requests.append(self._requests.get_nowait())
+            except queue.Empty:
+                break
+        for request in requests:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError('Inference server stopped'))
+
+    # Request the probabilities of the next token of a stream given its next token ID, returning a future
+    def submit(self, stream_id, token_id):
+        future = concurrent.futures.Future()
+        self._requests.put(_request(stream_id, token_id, future))
+        return future
+
+    # Probabilities of the next token of a stream given its next token ID
+    def predict(self, stream_id, token_id):
+        return self.submit(stream_id, token_id).result()
+
+    # Probabilities of the next token of a stream given its next token ID, for callers in an asyncio event loop
+    async def predict_async(self, stream_id, token_id):
+        return await asyncio.wrap_future(self.submit(stream_id, token_id))
+
+    # Forget the state of a stream, so that its next request starts from the zero state
+    def reset_stream(self, stream_id):
+        with self._states_lock:
+            self._states.pop(stream_id, None)
+
+    # Mean number of requests in the micro-batches served so far
+    def mean_batch_size(self):
+        return self._num_requests / max(self._num_batches, 1)
@@ -0,0 +1,73 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# The input pipeline class that builds the batches for the LSTM, SCRN, and SRN models inside Tensorflow, as an
+# alternative to feeding the batches from the batch generator.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import tensorflow as tf
+
+#
+class input_pipeline(object):
+
+    # The token matrix of shape (batch_size, sub_text_size) is fed once per epoch when the pipeline is initialized, and
+    # each window of num_unfoldings + 1 columns is then sliced and converted in parallel map calls and prefetched.
+    # When chunk_size is given each window is split into num_unfoldings // chunk_size chunks of chunk_size + 1
+    # unfoldings that are read one at a time.
+    def __init__(self, batch_size, num_unfoldings, vocabulary_size, token_ids_flg, num_parallel_calls=4,
+                 prefetch_size=2, chunk_size=None):
+
+        #
+        self._batch_size = batch_size
+        self._num_unfoldings = num_unfoldings
+        self._token_ids_flg = token_ids_flg
+        self._vocabulary_size = vocabulary_size
+        self._chunk_size = chunk_size
+
+        #
+        self._text_matrix = tf.placeholder(tf.int32, shape=[self._batch_size, None])
+        num_batches = (tf.shape(self._text_matrix, out_type=tf.int64)[1] - 1) // self._num_unfoldings
+        dataset = tf.data.Dataset.range(num_batches)
+        dataset = dataset.map(self._window, num_parallel_calls=num_parallel_calls)
+        if self._chunk_size is not None:
+            dataset = dataset.flat_map(self._chunks)
+        dataset = dataset.prefetch(prefetch_size)
+        self._iterator = dataset.make_initializable_iterator()
+        self._next_window = self._iterator.get_next()
+
+    # Slice the window of the batch_idx-th batch out of the token matrix as a tensor of shape
+    # (num_unfoldings + 1, batch_size) of token IDs or (num_unfoldings + 1, batch_size, vocabulary_size) of one-hot
+    # vectors
+    def _window(self, batch_idx):
+        first_token_idx = tf.cast(batch_idx, tf.int32) * self._num_unfoldings
+        window = tf.transpose(self._text_matrix[:, first_token_idx:first_token_idx + self._num_unfoldings + 1])
+        window.set_shape([self._num_unfoldings + 1, self._batch_size])
+        if self._token_ids_flg:
+            return window
+        else:
+            return tf.one_hot(window, self._vocabulary_size)
+
+    # Split a window into its chunks, each overlapping the next in one unfolding
+    def _chunks(self, window):
+        chunks = [ window[i*self._chunk_size:(i+1)*self._chunk_size + 1]
+                   for i in range(self._num_unfoldings // self._chunk_size) ]
+        return tf.data.Dataset.from_tensor_slices(tf.stack(chunks))
+
+    # Start a pass over the token matrix
+    def initialize(self, session, text_matrix):
+        session.run(self._iterator.initializer, feed_dict={self._text_matrix: text_matrix})
+
+    # List of the input tensors for each unfolding of the next batch
+    def next_batch(self):
+        return tf.unstack(self._next_window)
+
+    # Input tensor of the next batch or chunk with the unfoldings stacked along the first dimension
+    def next_window(self):
+        return self._next_window
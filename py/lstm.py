@@ -6,9 +6,8 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# This code fails to implement hierarchical softmax at this time as Tensorflow does not appear to include an
-# implementation.  Hierarchical softmax can be included at a future date when hierarchical softmax is available 
-# for Tensorflow.
+# The output layer is either a full softmax over the vocabulary or the class-based hierarchical softmax given in
+# class_softmax.py.
 #
 # Stuart Hagler, 2017
 
@@ -23,22 +22,72 @@ class lstm_graph(base_rnn_graph2):
     
     # LSTM cell definition   .
     def _cell(self, x, h, c):
+        if self._fused_cell_flg:
+            return self._fused_cell(x, h, c)
         with tf.name_scope('Forget_Gate'):
-            forget_arg = tf.matmul(x, self._Wf) + tf.matmul(h, self._Uf)
+            forget_arg = self._embed(x, self._Wf) + tf.matmul(h, self._Uf)
             forget_gate = tf.sigmoid(forget_arg + self._forget_bias)
         with tf.name_scope('Input_Gate'):
-            input_arg = tf.matmul(x, self._Wi) + tf.matmul(h, self._Ui)
+            input_arg = self._embed(x, self._Wi) + tf.matmul(h, self._Ui)
             input_gate = tf.sigmoid(input_arg + self._input_bias)
         with tf.name_scope('Output_Gate'):
-            output_arg = tf.matmul(x, self._Wo) + tf.matmul(h, self._Uo)
+            output_arg = self._embed(x, self._Wo) + tf.matmul(h, self._Uo)
             output_gate = tf.sigmoid(output_arg + self._output_bias)
         with tf.name_scope('State'):
-            update_arg = tf.matmul(x, self._Wc) + tf.matmul(h, self._Uc)
+            update_arg = self._embed(x, self._Wc) + tf.matmul(h, self._Uc)
             state = forget_gate * c + input_gate * tf.tanh(update_arg + self._update_bias)
         with tf.name_scope('Output'):
             output = output_gate * tf.tanh(state)
         return output, state
     
+    # LSTM cell with the arguments of the four gates computed in a single embedding of the input and a single matrix
+    # multiply on the hidden vector
+    def _fused_cell(self, x, h, c):
+        return self._projected_cell(self._embed(x, self._W_gates), h, c)
+    
+    # Input arguments of the four gates, concatenated in the order of the fused gate tensors
+    def _input_projection(self, x):
+        if self._fused_cell_flg:
+            return self._embed(x, self._W_gates)
+        return tf.concat([ self._embed(x, W) for W in [self._Wf, self._Wi, self._Wo, self._Wc] ], -1)
+    
+    # LSTM cell given the concatenated input arguments of the four gates
+    def _projected_cell(self, gate_input_args, h, c):
+        with tf.name_scope('Gates'):
+            if self._fused_cell_flg:
+                gate_args = gate_input_args + tf.matmul(h, self._U_gates) + self._gate_bias
+                forget_arg, input_arg, output_arg, update_arg = tf.split(gate_args, 4, 1)
+            else:
+                forget_arg, input_arg, output_arg, update_arg = \
+                    [ gate_input_arg + tf.matmul(h, U) + bias
+                      for gate_input_arg, U, bias in zip(tf.split(gate_input_args, 4, 1),
+                                                         [self._Uf, self._Ui, self._Uo, self._Uc],
+                                                         [self._forget_bias, self._input_bias, self._output_bias,
+                                                          self._update_bias]) ]
+        with tf.name_scope('Forget_Gate'):
+            forget_gate = tf.sigmoid(forget_arg)
+        with tf.name_scope('Input_Gate'):
+            input_gate = tf.sigmoid(input_arg)
+        with tf.name_scope('Output_Gate'):
+            output_gate = tf.sigmoid(output_arg)
+        with tf.name_scope('State'):
+            state = forget_gate * c + input_gate * tf.tanh(update_arg)
+        with tf.name_scope('Output'):
+            output = output_gate * tf.tanh(state)
+        return output, state
+    
+    # LSTM cell and output layer parameters exported for the NumPy engine
+    def _exported_parameters(self):
+        return {'Wf': self._Wf, 'Uf': self._Uf, 'bf': self._forget_bias,
+                'Wi': self._Wi, 'Ui': self._Ui, 'bi': self._input_bias,
+                'Wo': self._Wo, 'Uo': self._Uo, 'bo': self._output_bias,
+                'Wc': self._Wc, 'Uc': self._Uc, 'bc': self._update_bias,
+                'W': self._W, 'b': self._W_bias}
+    
+    #
+    def _exported_hyperparameters(self):
+        return {'model': 'lstm', 'hidden_size': self._hidden_size, 'state_size': self._state_size}
+    
     # Setup LSTM cell parameters
     def _setup_cell_parameters(self):
         
@@ -46,40 +95,62 @@ class lstm_graph(base_rnn_graph2):
         if self._hidden_size != self._state_size:
             print("Hidden size must equal state size")
         
-        # Forget gate input and output tensor and bias.
-        with tf.name_scope('Wf'):
-            self._Wf = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('Uf'):
-            self._Uf = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('bf'):
-            self._forget_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
+        if self._fused_cell_flg:
+            
+            # Concatenated forget gate, input gate, output gate, and cell state update input and output tensors and
+            # biases.
+            with tf.name_scope('W_gates'):
+                self._W_gates = tf.Variable(tf.truncated_normal([self._vocabulary_size, 4 * self._hidden_size], -0.1,
+                                                                0.1))
+            with tf.name_scope('U_gates'):
+                self._U_gates = tf.Variable(tf.truncated_normal([self._hidden_size, 4 * self._hidden_size], -0.1,
+                                                                0.1))
+            with tf.name_scope('b_gates'):
+                self._gate_bias = tf.Variable(tf.zeros([1, 4 * self._hidden_size]))
+            self._Wf, self._Wi, self._Wo, self._Wc = tf.split(self._W_gates, 4, 1)
+            self._Uf, self._Ui, self._Uo, self._Uc = tf.split(self._U_gates, 4, 1)
+            self._forget_bias, self._input_bias, self._output_bias, self._update_bias = tf.split(self._gate_bias, 4, 1)
+            
+        else:
+            
+            # Forget gate input and output tensor and bias.
+            with tf.name_scope('Wf'):
+                self._Wf = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('Uf'):
+                self._Uf = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('bf'):
+                self._forget_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
 
-        # Input gate input and output tensor and bias.
-        with tf.name_scope('Wi'):
-            self._Wi = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('Ui'):
-            self._Ui = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('bi'):
-            self._input_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
+            # Input gate input and output tensor and bias.
+            with tf.name_scope('Wi'):
+                self._Wi = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('Ui'):
+                self._Ui = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('bi'):
+                self._input_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
 
-        # Output gate input and output tensor and bias.
-        with tf.name_scope('Wo'):
-            self._Wo = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('Uo'):
-            self._Uo = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('bo'):
-            self._output_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
+            # Output gate input and output tensor and bias.
+            with tf.name_scope('Wo'):
+                self._Wo = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('Uo'):
+                self._Uo = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('bo'):
+                self._output_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
 
-        # Cell state update input and output tensor and bias.
-        with tf.name_scope('Wc'):
-            self._Wc = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('Uc'):
-            self._Uc = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
-        with tf.name_scope('bc'):
-            self._update_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
+            # Cell state update input and output tensor and bias.
+            with tf.name_scope('Wc'):
+                self._Wc = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('Uc'):
+                self._Uc = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
+            with tf.name_scope('bc'):
+                self._update_bias = tf.Variable(tf.zeros([1, self._hidden_size]))
 
         # Softmax weight tensor and bias.
         with tf.name_scope('W'):
-            self._W = tf.Variable(tf.truncated_normal([self._hidden_size, self._vocabulary_size], -0.1, 0.1))
+            self._W = self._output_weights(self._hidden_size)
         with tf.name_scope('b'):
-            self._W_bias = tf.Variable(tf.zeros([self._vocabulary_size]))
\ No newline at end of file
+            self._W_bias = tf.Variable(tf.zeros([self._vocabulary_size]))
+            
+        # Softmax weights and bias acting on the output vector.
+        self._softmax_weights = self._W
+        self._softmax_bias = self._W_bias
\ No newline at end of file
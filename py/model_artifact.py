@@ -0,0 +1,93 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# A model artifact holding the trained parameters, hyperparameters, and dictionary of an LSTM, SCRN, or SRN model.  An
+# artifact is a directory with each parameter array in its own .npy file, whose data np.save aligns past the header,
+# along with a small manifest of the hyperparameters and the dictionary in separate .json files.  The arrays are
+# memory-mapped read-only on first use, so that opening an artifact takes the same time whatever the size of the model
+# and every process on a host scoring with the same artifact shares a single copy of the parameters in the page cache.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import json
+import numpy as np
+import os
+
+# Write the file at path through a temporary file, so that a reader never sees a partly written file
+def _write_file(path, write, mode='w'):
+    with open(path + '.tmp', mode) as f:
+        write(f)
+    os.replace(path + '.tmp', path)
+
+# Write the dictionary of array names to arrays, the dictionary of hyperparameters, and the dictionary of tokens to
+# token IDs to an artifact in the directory path.  The manifest is written last, so an artifact is only complete once
+# it has a manifest.
+def write_model_artifact(path, arrays, hyperparameters, dictionary=None):
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        _write_file(os.path.join(path, name + '.npy'), lambda f: np.save(f, np.ascontiguousarray(array)), 'wb')
+    if dictionary is not None:
+        _write_file(os.path.join(path, 'dictionary.json'), lambda f: json.dump(dictionary, f))
+    manifest = {'arrays': sorted(arrays.keys()), 'hyperparameters': hyperparameters,
+                'dictionary_flg': dictionary is not None}
+    _write_file(os.path.join(path, 'manifest.json'), lambda f: json.dump(manifest, f))
+
+#
+class model_artifact(object):
+
+    # Open the artifact in the directory path, which reads only the manifest
+    def __init__(self, path):
+
+        #
+        self._path = path
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            raise ValueError('No model artifact at %s' % path)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        self._array_names = manifest['arrays']
+        self._hyperparameters = manifest['hyperparameters']
+        self._dictionary_flg = manifest['dictionary_flg']
+
+        #
+        self._arrays = dict()
+        self._dictionary = None
+        self._reverse_dictionary = None
+
+    # Read-only memory map of the array called name
+    def array(self, name):
+        if name not in self._arrays:
+            if name not in self._array_names:
+                raise KeyError('No array %s in model artifact at %s' % (name, self._path))
+            self._arrays[name] = np.load(os.path.join(self._path, name + '.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    #
+    def array_names(self):
+        return list(self._array_names)
+
+    #
+    def hyperparameters(self):
+        return dict(self._hyperparameters)
+
+    # Dictionary of tokens to token IDs, read on first use
+    def dictionary(self):
+        if self._dictionary is None:
+            if not self._dictionary_flg:
+                raise ValueError('No dictionary in model artifact at %s' % self._path)
+            with open(os.path.join(self._path, 'dictionary.json')) as f:
+                self._dictionary = json.load(f)
+        return self._dictionary
+
+    # Dictionary of token IDs to tokens
+    def reverse_dictionary(self):
+        if self._reverse_dictionary is None:
+            dictionary = self.dictionary()
+            self._reverse_dictionary = dict(zip(dictionary.values(), dictionary.keys()))
+        return self._reverse_dictionary
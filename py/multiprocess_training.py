@@ -0,0 +1,178 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# Synchronous data-parallel training of the LSTM, SCRN, and SRN models in several worker processes on a single host.
+# Each worker process builds its own graph and session and trains on its own shards of the texts, and the workers
+# average their gradients after every optimization step with an allreduce over shared memory, so that a single Python
+# process and its feeds no longer limit how many cores the training uses.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import multiprocessing
+import multiprocessing.connection
+import numpy as np
+import os
+
+# Number of scalars each worker process can contribute to a sum
+_max_scalars = 8
+
+#
+class shared_memory_allreduce(object):
+
+    # The shared buffers are created in the launching process with room for up to size values from each of the
+    # num_workers worker processes, and each worker process attaches to them with its rank
+    def __init__(self, context, num_workers, size, num_threads):
+
+        #
+        self._num_workers = num_workers
+        self._size = size
+        self._num_threads = num_threads
+
+        #
+        self._vectors = context.RawArray('f', num_workers * size)
+        self._result = context.RawArray('f', size)
+        self._scalars = context.RawArray('d', num_workers * _max_scalars)
+        self._barrier = context.Barrier(num_workers)
+        self._rank = None
+
+    # Attach a worker process with its rank, the buffers are viewed as arrays only once they are in the worker process
+    def attach(self, rank):
+        self._rank = rank
+        self._vector_array = np.frombuffer(self._vectors, dtype=np.float32).reshape(self._num_workers, self._size)
+        self._result_array = np.frombuffer(self._result, dtype=np.float32)
+        self._scalar_array = np.frombuffer(self._scalars, dtype=np.float64).reshape(self._num_workers, _max_scalars)
+
+    # Flatten a list of arrays into a single vector
+    def _flatten(self, arrays):
+        vector = np.concatenate([ np.ravel(array) for array in arrays ])
+        if len(vector) > self._size:
+            raise ValueError('Allreduce of %d values needs a buffer of at least that size, not %d' %
+                             (len(vector), self._size))
+        return vector
+
+    # Split a vector back into arrays of the shapes of a list of arrays
+    def _unflatten(self, vector, arrays):
+        offsets = np.cumsum([ np.size(array) for array in arrays ])[:-1]
+        return [ part.reshape(np.shape(array)) for part, array in zip(np.split(vector, offsets), arrays) ]
+
+    # Average a list of arrays across the worker processes, each worker reduces its own segment of the vectors of all
+    # of the workers into the result so that the work of the reduction is split between the workers.  A worker only
+    # writes the result again after the next first barrier, which every worker passes once it has read this result.
+    def mean(self, arrays):
+        vector = self._flatten(arrays)
+        size = len(vector)
+        self._vector_array[self._rank, :size] = vector
+        self._barrier.wait()
+        bounds = np.linspace(0, size, self._num_workers + 1).astype(np.int64)
+        start, end = bounds[self._rank], bounds[self._rank + 1]
+        self._result_array[start:end] = self._vector_array[:, start:end].mean(axis=0)
+        self._barrier.wait()
+        return self._unflatten(self._result_array[:size].copy(), arrays)
+
+    # Sum a list of scalars across the worker processes in double precision
+    def sum(self, scalars):
+        self._scalar_array[self._rank, :len(scalars)] = scalars
+        self._barrier.wait()
+        total = self._scalar_array[:, :len(scalars)].sum(axis=0)
+        self._barrier.wait()
+        return total.tolist()
+
+    # Copy a list of arrays from the first worker process to the other workers, once every worker is done reading the
+    # result of the last mean
+    def broadcast(self, arrays):
+        vector = self._flatten(arrays)
+        size = len(vector)
+        self._barrier.wait()
+        if self._rank == 0:
+            self._result_array[:size] = vector
+        self._barrier.wait()
+        return self._unflatten(self._result_array[:size].copy(), arrays)
+
+    #
+    def num_threads(self):
+        return self._num_threads
+
+    #
+    def num_workers(self):
+        return self._num_workers
+
+    #
+    def rank(self):
+        return self._rank
+
+# Entry point of a worker process, which passes the result of the target back to the launching process
+def _run_worker(allreduce, rank, target, args, results):
+    allreduce.attach(rank)
+    results.put((rank, target(allreduce, *args)))
+
+# Run target(allreduce, *args_list[rank]) in a worker process for each rank with an allreduce of up to size values and
+# return the results in order of rank, with num_threads Tensorflow threads in each worker process and the cores of the
+# host split evenly between the workers by default.  Worker processes are started with spawn rather than fork, since
+# a process that has already used Tensorflow cannot safely be forked.
+def run_workers(num_workers, size, target, args_list, num_threads=None):
+    if num_threads is None:
+        num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    context = multiprocessing.get_context('spawn')
+    allreduce = shared_memory_allreduce(context, num_workers, size, num_threads)
+    results = context.Queue()
+    workers = [ context.Process(target=_run_worker, args=(allreduce, rank, target, args_list[rank], results))
+                for rank in range(num_workers) ]
+    for worker in workers:
+        worker.start()
+    try:
+
+        # Wait for the worker processes, stopping all of them if any fails since the others would wait for it forever
+        running = list(workers)
+        while running:
+            multiprocessing.connection.wait([ worker.sentinel for worker in running ])
+            for worker in running:
+                if worker.exitcode is not None and worker.exitcode != 0:
+                    raise RuntimeError('Worker process %d exited with code %d' % (workers.index(worker),
+                                                                                  worker.exitcode))
+            running = [ worker for worker in running if worker.exitcode is None ]
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+    return [ result for _, result in sorted([ results.get() for _ in range(num_workers) ]) ]
+
+# Split a list of texts, one for each tower of each worker process, into the texts of each worker process, which need
+# the same length so that every worker runs the same number of steps
+def _worker_texts(texts, num_workers, num_towers):
+    if len(texts) != num_workers * num_towers:
+        raise ValueError('Need %d texts for %d workers with %d towers each, not %d' %
+                         (num_workers * num_towers, num_workers, num_towers, len(texts)))
+    if len(set([ len(text) for text in texts ])) > 1:
+        raise ValueError('The texts of every tower of every worker need the same length')
+    return [ texts[worker*num_towers:(worker+1)*num_towers] for worker in range(num_workers) ]
+
+# Build a graph in a worker process and train it
+def _train_worker(allreduce, graph_class, graph_args, graph_kwargs, train_args, train_kwargs):
+    graph = graph_class(*graph_args, **graph_kwargs)
+    graph.setup_allreduce(allreduce)
+    graph.train(*train_args, **train_kwargs)
+
+# Train a graph of class graph_class, built with graph_args and graph_kwargs, in num_workers worker processes, with
+# the same arguments as the train method of base_rnn_graph except that the lists of training, validation, and testing
+# texts hold a text for each tower of each worker process
+def train_multiprocess(num_workers, graph_class, graph_args, graph_kwargs, learning_rate, learning_decay, momentum,
+                       clip_norm, num_epochs, summary_frequency, training_text, validation_text, testing_text, logdir,
+                       prefetch_depth=2, evaluation_batch_size=None, checkpoint_path=None, num_threads=None):
+    graph = graph_class(*graph_args, **graph_kwargs)
+    size = graph.num_parameters()
+    num_towers = graph._num_towers
+    texts = [ _worker_texts(text, num_workers, num_towers) for text in [training_text, validation_text, testing_text] ]
+    args_list = [ (graph_class, graph_args, graph_kwargs,
+                   (learning_rate, learning_decay, momentum, clip_norm, num_epochs, summary_frequency,
+                    texts[0][worker], texts[1][worker], texts[2][worker], logdir),
+                   dict(prefetch_depth=prefetch_depth, evaluation_batch_size=evaluation_batch_size,
+                        checkpoint_path=checkpoint_path))
+                  for worker in range(num_workers) ]
+    run_workers(num_workers, size, _train_worker, args_list, num_threads)
@@ -0,0 +1,200 @@
+# Structurally Constrained Recurrent Network (SCRN) Model
+#
+# This gives an implementation of the SCRN model given in Mikolov et al. 2015, arXiv:1412.7753 [cs.NE],
+# https://arxiv.org/abs/1412.7753 using Python and Tensorflow.
+#
+# This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL],
+# https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
+#
+# The NumPy engine class that runs the LSTM, SCRN, and SRN cells and output layers of a trained model on batches of
+# token IDs with the parameters of a model artifact written by the export method of the graph, so that a model can be
+# used for scoring and prediction without importing Tensorflow or building a graph.  The large embedding and output
+# matrices are used straight from the memory maps of the artifact, with only the rows of the tokens of a batch
+# gathered, while the small recurrent matrices are fused into a single matrix multiply as in the fused cells of the
+# graphs.
+#
+# Stuart Hagler, 2017
+
+# Imports
+import math
+import numpy as np
+
+# Local imports
+from batch_generator import evaluation_rows
+from model_artifact import model_artifact
+
+# Logistic sigmoid written with tanh so that large arguments do not overflow
+def _sigmoid(x):
+    return 0.5 * np.tanh(0.5 * x) + 0.5
+
+# Natural log-softmax of each row
+def _log_softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+
+#
+class numpy_engine(object):
+
+    # Open the model artifact in the directory path
+    def __init__(self, path):
+
+        #
+        self._artifact = model_artifact(path)
+        array = self._artifact.array
+        hyperparameters = self._artifact.hyperparameters()
+        self._model = hyperparameters['model']
+        self._vocabulary_size = hyperparameters['vocabulary_size']
+
+        # Input embeddings with their scales and the recurrent weights and bias of the fused cell, and output weights
+        # acting on consecutive slices of the output of the cell and output bias
+        if self._model == 'scrn':
+            alpha = hyperparameters['alpha']
+            hidden_size, state_size = hyperparameters['hidden_size'], hyperparameters['state_size']
+            self._state_sizes = [ hidden_size, state_size ]
+            self._input_weights = [ array('B'), array('A') ]
+            self._input_scales = [ 1 - alpha, 1 ]
+            self._recurrent_weights = np.block([[alpha * np.eye(state_size, dtype=np.float32), array('P')],
+                                                [np.zeros([hidden_size, state_size], dtype=np.float32), array('R')]])
+            self._bias = None
+            self._output_weights = [ array('U'), array('V') ]
+            self._output_bias = None
+        elif self._model == 'lstm':
+            hidden_size = hyperparameters['hidden_size']
+            self._state_sizes = [ hidden_size, hyperparameters['state_size'] ]
+            gates = ['f', 'i', 'o', 'c']
+            self._input_weights = [ array('W' + gate) for gate in gates ]
+            self._input_scales = [ 1 ] * len(gates)
+            self._recurrent_weights = np.concatenate([ array('U' + gate) for gate in gates ], 1)
+            self._bias = np.concatenate([ array('b' + gate) for gate in gates ], 1)
+            self._output_weights = [ array('W') ]
+            self._output_bias = array('b')
+        elif self._model == 'srn':
+            self._state_sizes = [ hyperparameters['hidden_size'] ]
+            self._input_weights = [ array('A') ]
+            self._input_scales = [ 1 ]
+            self._recurrent_weights = array('R')
+            self._bias = None
+            self._output_weights = [ array('U') ]
+            self._output_bias = None
+        else:
+            raise ValueError('Unknown model: %s' % self._model)
+
+        # Class-based hierarchical softmax, with the tokens of each class and the position of each token in its class
+        # found on first use
+        if 'token_classes' in self._artifact.array_names():
+            self._class_weights = array('class_W')
+            self._class_bias = array('class_b')
+            self._token_classes = array('token_classes')
+            self._class_members = None
+        else:
+            self._token_classes = None
+
+    # Tokens of each class and position of each token in its class for the class-based hierarchical softmax
+    def _classes(self):
+        if self._class_members is None:
+            self._class_members = [ np.flatnonzero(self._token_classes == c) for c in range(len(self._class_bias)) ]
+            self._token_positions = np.zeros(self._vocabulary_size, dtype=np.int64)
+            for members in self._class_members:
+                self._token_positions[members] = np.arange(len(members))
+        return self._class_members, self._token_positions
+
+    # Embedding of an array of token IDs, gathering only the rows of the tokens from each embedding matrix
+    def _embed(self, token_ids):
+        return np.concatenate([ weights[token_ids] if scale == 1 else scale * weights[token_ids]
+                                for weights, scale in zip(self._input_weights, self._input_scales) ], -1)
+
+    # Run one step of the cell on the embedded inputs of a batch and a list of state arrays, and return the output and
+    # the new state
+    def _step(self, input_arg, state):
+        if self._model == 'scrn':
+            h, s = state
+            args = input_arg + np.concatenate([s, h], 1).dot(self._recurrent_weights)
+            s = args[:, :self._state_sizes[1]]
+            h = _sigmoid(args[:, self._state_sizes[1]:])
+            return np.concatenate([h, s], 1), [h, s]
+        elif self._model == 'lstm':
+            h, c = state
+            forget_arg, input_arg, output_arg, update_arg = np.split(input_arg + h.dot(self._recurrent_weights) +
+                                                                     self._bias, 4, 1)
+            c = _sigmoid(forget_arg) * c + _sigmoid(input_arg) * np.tanh(update_arg)
+            h = _sigmoid(output_arg) * np.tanh(c)
+            return h, [h, c]
+        elif self._model == 'srn':
+            h = _sigmoid(input_arg + state[0].dot(self._recurrent_weights))
+            return h, [h]
+
+    # Run the cell over the unfoldings of a tensor of token IDs of shape (num_unfoldings, batch_size) from a list of
+    # state arrays, with the inputs of every unfolding embedded at once, and return the outputs of shape
+    # (num_unfoldings, batch_size, output_size) and the final state
+    def _run(self, token_ids, state):
+        input_args = self._embed(token_ids)
+        outputs = []
+        for input_arg in input_args:
+            output, state = self._step(input_arg, state)
+            outputs.append(output)
+        return np.stack(outputs), state
+
+    # Natural log-probabilities over the whole vocabulary given a batch of outputs of the cell
+    def _log_probabilities(self, outputs):
+        if self._token_classes is None:
+            return _log_softmax(self._output_logits(outputs, slice(None)))
+        class_log_probs = _log_softmax(outputs.dot(self._class_weights) + self._class_bias)
+        log_probs = np.zeros([len(outputs), self._vocabulary_size], dtype=np.float32)
+        for c, members in enumerate(self._classes()[0]):
+            log_probs[:, members] = class_log_probs[:, c:c+1] + _log_softmax(self._output_logits(outputs, members))
+        return log_probs
+
+    # Natural log-probabilities of a batch of labels given the outputs of the cell, which only needs the output
+    # weights of the tokens in the classes of the labels for the class-based hierarchical softmax
+    def _log_probs(self, outputs, labels):
+        if self._token_classes is None:
+            log_probs = _log_softmax(self._output_logits(outputs, slice(None)))
+            return log_probs[np.arange(len(labels)), labels]
+        class_members, token_positions = self._classes()
+        classes = self._token_classes[labels]
+        class_log_probs = _log_softmax(outputs.dot(self._class_weights) + self._class_bias)
+        log_probs = class_log_probs[np.arange(len(labels)), classes]
+        for c in np.unique(classes):
+            rows = np.flatnonzero(classes == c)
+            member_log_probs = _log_softmax(self._output_logits(outputs[rows], class_members[c]))
+            log_probs[rows] += member_log_probs[np.arange(len(rows)), token_positions[labels[rows]]]
+        return log_probs
+
+    # Logits of the tokens selected by columns given a batch of outputs of the cell
+    def _output_logits(self, outputs, columns):
+        logits = 0
+        start = 0
+        for weights in self._output_weights:
+            logits = logits + outputs[:, start:start + weights.shape[0]].dot(weights[:, columns])
+            start += weights.shape[0]
+        if self._output_bias is not None:
+            logits += self._output_bias[columns]
+        return logits
+
+    # List of zero state arrays for a batch of size batch_size
+    def zero_state(self, batch_size):
+        return [ np.zeros([batch_size, state_size], dtype=np.float32) for state_size in self._state_sizes ]
+
+    # Run one step of the cell on a batch of token IDs from a list of state arrays and return the probabilities of the
+    # next token and the new state
+    def predict(self, token_ids, state):
+        output, state = self._step(self._embed(np.asarray(token_ids)), state)
+        return np.exp(self._log_probabilities(output)), state
+
+    # Perplexity of a whole text, split into batch_size rows and run num_unfoldings at a time as in the evaluate method
+    # of the graph, with the same clamping of the probabilities below at 1e-10
+    def evaluate(self, text, batch_size, num_unfoldings=50):
+        text_matrix, mask = evaluation_rows(text, batch_size)
+        batch_size, row_size = mask.shape
+        state = self.zero_state(batch_size)
+        log_prob_sum = 0
+        N = 0
+        for start in range(0, row_size, num_unfoldings):
+            end = min(start + num_unfoldings, row_size)
+            outputs, state = self._run(text_matrix[:, start:end].T, state)
+            log_probs = self._log_probs(outputs.reshape([-1, outputs.shape[2]]),
+                                        text_matrix[:, start + 1:end + 1].T.ravel())
+            log_prob = np.maximum(log_probs, math.log(1e-10)) / math.log(2)
+            log_prob_sum += float((log_prob * mask[:, start:end].T.ravel()).sum())
+            N += float(mask[:, start:end].sum())
+        return float(2 ** (-log_prob_sum / N))
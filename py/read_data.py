@@ -6,7 +6,8 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# A read data function that reads data in a zip-file for feeding into the LSTM, SCRN, and SRN models.
+# A read data function that reads data in a zip-file for feeding into the LSTM, SCRN, and SRN models, and a streaming 
+# version that reads zip-files, gzip-files, text files, or directories of shards in fixed-size chunks.
 #
 # Stuart Hagler, 2017
 
@@ -14,6 +15,9 @@
 #               2 for predicting words with cutoff for infrequent words
 
 # Imports
+import codecs
+import gzip
+import os
 import tensorflow as tf
 import zipfile
 
@@ -25,4 +29,44 @@ def read_data(usecase_flg, filename):
         elif usecase_flg == 2:
             raw_data = tf.compat.as_str(f.read(f.namelist()[0])).split()
     # Return data
-    return raw_data
\ No newline at end of file
+    return raw_data
+
+# Open the binary text streams of a data file: the first member of a zip-file, a gzip-file, a plain text file, or each 
+# file of a directory of shards in sorted order
+def _open_data_files(filename):
+    if os.path.isdir(filename):
+        for name in sorted(os.listdir(filename)):
+            for f in _open_data_files(os.path.join(filename, name)):
+                yield f
+    elif zipfile.is_zipfile(filename):
+        with zipfile.ZipFile(filename) as z:
+            with z.open(z.namelist()[0]) as f:
+                yield f
+    elif filename.endswith('.gz'):
+        with gzip.open(filename, 'rb') as f:
+            yield f
+    else:
+        with open(filename, 'rb') as f:
+            yield f
+
+# Read datafile in chunks of chunk_size bytes, yielding strings of letters for usecase_flg = 1 and lists of words for
+# usecase_flg = 2, with words that are split across chunk boundaries held back and joined to the next chunk
+def read_data_chunks(usecase_flg, filename, chunk_size=1 << 24):
+    for f in _open_data_files(filename):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        partial_word = ''
+        while True:
+            block = f.read(chunk_size)
+            text = decoder.decode(block, final=not block)
+            if usecase_flg == 1:
+                if text:
+                    yield text
+            elif usecase_flg == 2:
+                words = (partial_word + text).split()
+                partial_word = ''
+                if block and words and not text[-1:].isspace():
+                    partial_word = words.pop()
+                if words:
+                    yield words
+            if not block:
+                break
@@ -6,9 +6,8 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# This code fails to implement hierarchical softmax at this time as Tensorflow does not appear to include an
-# implementation.  Hierarchical softmax can be included at a future date when hierarchical softmax is available 
-# for Tensorflow.
+# The output layer is either a full softmax over the vocabulary or the class-based hierarchical softmax given in
+# class_softmax.py.
 #
 # Stuart Hagler, 2017
 
@@ -23,48 +22,187 @@ class scrn_graph(base_rnn_graph3):
     
     # Graph constructor
     def __init__(self, num_gpus, alpha, hidden_size, state_size, vocabulary_size, num_training_unfoldings,
-                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency):
+                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency,
+                 parallel_state_flg=False, **kwargs):
         
         # Input hyperparameters
         self._alpha = alpha
         
+        # Input flags
+        self._parallel_state_flg = parallel_state_flg   # True to compute the state vectors of every unfolding of a
+                                                        # window at once, so that only the hidden vectors are computed
+                                                        # one unfolding after another, False to compute both in the cell
+        
         base_rnn_graph3.__init__(self, num_gpus, hidden_size, state_size, vocabulary_size, num_training_unfoldings,
-                                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency)
+                                 num_validation_unfoldings, training_batch_size, validation_batch_size, optimization_frequency,
+                                 **kwargs)
     
     # SCRN cell definition   .
     def _cell(self, x, h, s):
+        if self._fused_cell_flg:
+            return self._fused_cell(x, h, s)
         with tf.name_scope('State'):
-            state_arg = (1 - self._alpha) * tf.matmul(x, self._B) + self._alpha * s
+            state_arg = (1 - self._alpha) * self._embed(x, self._B) + self._alpha * s
             state = state_arg
         with tf.name_scope('Hidden'):
-            hidden_arg = tf.matmul(s, self._P) + tf.matmul(x, self._A) + tf.matmul(h, self._R)
+            hidden_arg = tf.matmul(s, self._P) + self._embed(x, self._A) + tf.matmul(h, self._R)
             hidden = tf.sigmoid(hidden_arg)
         with tf.name_scope('Output'):
-            output_arg = tf.matmul(hidden, self._U) + tf.matmul(state, self._V) 
-            output = output_arg
+            output = tf.concat([hidden, state], 1)
         return output, hidden, state
     
+    # SCRN cell with the state and hidden arguments computed together in a single embedding of the input and a single
+    # matrix multiply on the concatenated state and hidden vectors
+    def _fused_cell(self, x, h, s):
+        return self._projected_cell(self._input_projection(x), h, s)
+    
+    # Context and token embeddings of the input, concatenated in the order of the fused embedding tensor with the
+    # context embedding scaled by 1 - alpha
+    def _input_projection(self, x):
+        if self._fused_cell_flg:
+            return self._embed(x, self._BA) * self._fused_input_scale
+        return tf.concat([(1 - self._alpha) * self._embed(x, self._B), self._embed(x, self._A)], -1)
+    
+    # SCRN cell given the concatenated context and token embeddings of the input
+    def _projected_cell(self, input_arg, h, s):
+        if self._fused_cell_flg:
+            with tf.name_scope('Arguments'):
+                recurrent_arg = tf.matmul(tf.concat([s, h], 1), self._fused_recurrent_weights)
+                state_arg, hidden_arg = tf.split(input_arg + recurrent_arg, [self._state_size, self._hidden_size], 1)
+        else:
+            with tf.name_scope('Arguments'):
+                state_input_arg, hidden_input_arg = tf.split(input_arg, [self._state_size, self._hidden_size], 1)
+                state_arg = state_input_arg + self._alpha * s
+                hidden_arg = tf.matmul(s, self._P) + hidden_input_arg + tf.matmul(h, self._R)
+        with tf.name_scope('State'):
+            state = state_arg
+        with tf.name_scope('Hidden'):
+            hidden = tf.sigmoid(hidden_arg)
+        with tf.name_scope('Output'):
+            output = tf.concat([hidden, state], 1)
+        return output, hidden, state
+    
+    # Context embedding scaled by 1 - alpha and token embedding of the input, gathered together from the fused embedding
+    # tensor in fused mode so that its gradient stays sparse for token IDs
+    def _parallel_embeddings(self, x):
+        if self._fused_cell_flg:
+            return tf.split(self._input_projection(x), [self._state_size, self._hidden_size], -1)
+        return (1 - self._alpha) * self._embed(x, self._B), self._embed(x, self._A)
+    
+    # State vectors of the unfoldings stacked along the first dimension of inputs starting from the state vector s, and
+    # the arguments of the hidden vectors from the state vectors of the previous unfoldings, and from the token
+    # embeddings of the inputs in hoisted input mode.  Since the state vector is linear in the inputs,
+    # s_t = alpha^t s + (1 - alpha) sum_k alpha^(t-k) x_k B, the state vectors of every unfolding are computed together
+    # as the product of a lower triangular decay matrix and the embedded inputs.
+    def _parallel_states(self, inputs, s):
+        with tf.name_scope('State'):
+            steps = tf.cast(tf.range(tf.shape(inputs)[0]), tf.float32)
+            decay = tf.linalg.band_part(tf.pow(self._alpha, tf.maximum(steps[:, None] - steps[None, :], 0)), -1, 0)
+            state_args, token_args = self._parallel_embeddings(inputs)
+            states = tf.tensordot(decay, state_args, 1) + tf.pow(self._alpha, steps + 1)[:, None, None] * s
+        with tf.name_scope('Hidden'):
+            hidden_args = tf.tensordot(tf.concat([tf.expand_dims(s, 0), states[:-1]], 0), self._P, 1)
+            if self._hoisted_input_flg:
+                hidden_args += token_args
+        return states, hidden_args
+    
+    # Hidden vector of one unfolding given the argument from the state vector of the previous unfolding
+    def _parallel_hidden(self, x, hidden_arg, h):
+        with tf.name_scope('Hidden'):
+            if not self._hoisted_input_flg:
+                hidden_arg += self._parallel_embeddings(x)[1]
+            return tf.sigmoid(hidden_arg + tf.matmul(h, self._R))
+    
+    # Run the cell over a list of unfoldings of the input, computing the state vectors at once in parallel state mode
+    def _unfold(self, inputs, state):
+        if not self._parallel_state_flg:
+            return base_rnn_graph3._unfold(self, inputs, state)
+        hidden, state = state
+        states, hidden_args = [ tf.unstack(tensor) for tensor in self._parallel_states(tf.stack(inputs), state) ]
+        outputs = []
+        for x, hidden_arg, state in zip(inputs, hidden_args, states):
+            hidden = self._parallel_hidden(x, hidden_arg, hidden)
+            outputs.append(tf.concat([hidden, state], 1))
+        return outputs, [hidden, state]
+    
+    # Run the cell over the unfoldings in a symbolic loop, computing the state vectors at once before the loop in
+    # parallel state mode
+    def _loop(self, inputs, initial_state):
+        if not self._parallel_state_flg:
+            return base_rnn_graph3._loop(self, inputs, initial_state)
+        hidden, state = initial_state
+        states, hidden_args = self._parallel_states(inputs, state)
+        num_unfoldings = tf.shape(inputs)[0]
+        hidden_args = tf.TensorArray(tf.float32, size=num_unfoldings).unstack(hidden_args)
+        def body(i, hidden, hiddens):
+            hidden = self._parallel_hidden(inputs[i], hidden_args.read(i), hidden)
+            return i + 1, hidden, hiddens.write(i, hidden)
+        _, hidden, hiddens = tf.while_loop(lambda i, hidden, hiddens: i < num_unfoldings, body,
+                                           [tf.constant(0), hidden, tf.TensorArray(tf.float32, size=num_unfoldings)])
+        return tf.concat([hiddens.stack(), states], 2), [hidden, states[-1]]
+    
+    # SCRN cell and output layer parameters exported for the NumPy engine
+    def _exported_parameters(self):
+        return {'A': self._A, 'B': self._B, 'P': self._P, 'R': self._R, 'U': self._U, 'V': self._V}
+    
+    #
+    def _exported_hyperparameters(self):
+        return {'model': 'scrn', 'alpha': self._alpha, 'hidden_size': self._hidden_size,
+                'state_size': self._state_size}
+    
     # Setup SCRN cell parameters
     def _setup_cell_parameters(self):
         
-        # Context embedding tensor.
-        with tf.name_scope('B'):
-            self._B = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._state_size], -0.1, 0.1))
+        if self._fused_cell_flg:
+            
+            # Concatenated context and token embedding tensors.
+            with tf.name_scope('BA'):
+                self._BA = tf.Variable(tf.truncated_normal([self._vocabulary_size,
+                                                            self._state_size + self._hidden_size], -0.1, 0.1))
+            self._B, self._A = tf.split(self._BA, [self._state_size, self._hidden_size], 1)
+            
+            # Stacked state and recurrent weights tensors.
+            with tf.name_scope('PR'):
+                self._PR = tf.Variable(tf.truncated_normal([self._state_size + self._hidden_size, self._hidden_size],
+                                                           -0.1, 0.1))
+            self._P, self._R = tf.split(self._PR, [self._state_size, self._hidden_size], 0)
+            
+            # Scale of the context and token embeddings, and recurrent tensor [[alpha*I, P], [0, R]] acting on the
+            # concatenated state and hidden vectors.
+            self._fused_input_scale = tf.constant([[1 - self._alpha] * self._state_size + [1.0] * self._hidden_size])
+            self._fused_recurrent_weights = tf.concat([tf.concat([self._alpha * tf.eye(self._state_size),
+                                                                  tf.zeros([self._hidden_size, self._state_size])], 0),
+                                                       self._PR], 1)
+            
+        else:
+        
+            # Context embedding tensor.
+            with tf.name_scope('B'):
+                self._B = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._state_size], -0.1, 0.1))
 
-        # Token embedding tensor.
-        with tf.name_scope('A'):
-            self._A = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
+            # Token embedding tensor.
+            with tf.name_scope('A'):
+                self._A = tf.Variable(tf.truncated_normal([self._vocabulary_size, self._hidden_size], -0.1, 0.1))
             
-        #
-        with tf.name_scope('P'):
-            self._P = tf.Variable(tf.truncated_normal([self._state_size, self._hidden_size], -0.1, 0.1))
+            #
+            with tf.name_scope('P'):
+                self._P = tf.Variable(tf.truncated_normal([self._state_size, self._hidden_size], -0.1, 0.1))
 
-        # Recurrent weights tensor and bias.
-        with tf.name_scope('R'):
-            self._R = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
+            # Recurrent weights tensor and bias.
+            with tf.name_scope('R'):
+                self._R = tf.Variable(tf.truncated_normal([self._hidden_size, self._hidden_size], -0.1, 0.1))
 
-        # Output update tensor and bias.
-        with tf.name_scope('U'):
-            self._U = tf.Variable(tf.truncated_normal([self._hidden_size, self._vocabulary_size], -0.1, 0.1))
-        with tf.name_scope('V'):
-            self._V = tf.Variable(tf.truncated_normal([self._state_size, self._vocabulary_size], -0.1, 0.1))
\ No newline at end of file
+        # Output update tensor and bias, and the output tensor acting on the concatenated hidden and state vectors.  For
+        # a sampled objective the output tensor is a single variable split into the output update tensors, so that the
+        # rows of the true and sampled tokens are gathered from it without concatenating the output update tensors.
+        if self._training_objective == 'softmax':
+            with tf.name_scope('U'):
+                self._U = self._output_weights(self._hidden_size)
+            with tf.name_scope('V'):
+                self._V = self._output_weights(self._state_size)
+            self._softmax_weights = tf.concat([self._U, self._V], 0)
+        else:
+            with tf.name_scope('UV'):
+                self._softmax_weights = self._output_weights(self._hidden_size + self._state_size)
+            self._U, self._V = tf.split(self._softmax_weights, [self._hidden_size, self._state_size], 0)
+        self._softmax_bias = None
\ No newline at end of file
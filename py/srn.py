@@ -6,9 +6,8 @@
 # This model is superceded by the Delta-RNN model given in Ororbia et al. 2017, arXiv:1703.08864 [cs.CL], 
 # https://arxiv.org/abs/1703.08864 implemented in this repository using Python and Tensorflow.
 #
-# This code fails to implement hierarchical softmax at this time as Tensorflow does not appear to include an
-# implementation.  Hierarchical softmax can be included at a future date when hierarchical softmax is available 
-# for Tensorflow.
+# The output layer is either a full softmax over the vocabulary or the class-based hierarchical softmax given in
+# class_softmax.py.
 #
 # Stuart Hagler, 2017
 
@@ -21,16 +20,36 @@ from base_rnn_graph1 import base_rnn_graph1
 # Define derived SRN TensorFlow graph class
 class srn_graph(base_rnn_graph1):
     
-    # SRN cell definition   .
+    # SRN cell definition, also used for fused cells since stacking the token embedding and recurrent weights to act on
+    # the concatenated one-hot input and hidden vectors copies the weights and input without saving any work
     def _cell(self, x, h):
         with tf.name_scope('Hidden'):
-            hidden_arg = tf.matmul(x, self._A) + tf.matmul(h, self._R)
+            hidden_arg = self._embed(x, self._A) + tf.matmul(h, self._R)
             hidden = tf.sigmoid(hidden_arg)
         with tf.name_scope('Output'):
-            output_arg = tf.matmul(hidden, self._U)
-            output = output_arg
+            output = hidden
         return output, hidden
     
+    # Token embedding of the input
+    def _input_projection(self, x):
+        return self._embed(x, self._A)
+    
+    # SRN cell given the token embedding of the input
+    def _projected_cell(self, input_arg, h):
+        with tf.name_scope('Hidden'):
+            hidden = tf.sigmoid(input_arg + tf.matmul(h, self._R))
+        with tf.name_scope('Output'):
+            output = hidden
+        return output, hidden
+    
+    # SRN cell and output layer parameters exported for the NumPy engine
+    def _exported_parameters(self):
+        return {'A': self._A, 'R': self._R, 'U': self._U}
+    
+    #
+    def _exported_hyperparameters(self):
+        return {'model': 'srn', 'hidden_size': self._hidden_size}
+    
     # Setup SRN cell parameters
     def _setup_cell_parameters(self):
         
@@ -44,4 +63,8 @@ class srn_graph(base_rnn_graph1):
 
         # Output update tensor and bias.
         with tf.name_scope('U'):
-            self._U = tf.Variable(tf.truncated_normal([self._hidden_size, self._vocabulary_size], -0.1, 0.1))
\ No newline at end of file
+            self._U = self._output_weights(self._hidden_size)
+            
+        # Output tensor acting on the hidden vector.
+        self._softmax_weights = self._U
+        self._softmax_bias = None
\ No newline at end of file
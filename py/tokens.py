@@ -15,46 +15,102 @@
 #               2 for predicting words with cutoff for infrequent words
 
 # Imports
-import collections
+import numpy as np
 import string
 
-# Generate dictionary of tokens for text elements and convert text to tokens
-def text_elements_to_tokens(usecase_flg, text_elements, word_frequency_cutoff):
+# Generate dictionary of tokens for letters
+def _letter_dictionary():
+    dictionary = dict()
+    letters = ['UNK']
+    letters += [' ']
+    for letter in string.ascii_lowercase:
+        letters += [letter]
+    for letter in letters:
+        dictionary[letter] = len(dictionary)
+    return dictionary
+
+# Convert text to tokens for letters with a 256-entry lookup table applied to the bytes of the text, mapping every byte 
+# that is not in the dictionary to UNK
+def _letters_to_tokens(text, dictionary):
+    lookup_table = np.full(256, dictionary['UNK'], dtype=np.uint8)
+    for letter, index in dictionary.items():
+        if len(letter) == 1:
+            lookup_table[ord(letter)] = index
+    if isinstance(text, str):
+        text = text.encode('ascii', 'replace')
+    elif not isinstance(text, (bytes, bytearray)):
+        text = ''.join(text).encode('ascii', 'replace')
+    return lookup_table[np.frombuffer(text, dtype=np.uint8)]
+
+# Convert words to provisional word IDs numbered in order of first appearance, adding new words to word_ids
+def _words_to_word_ids(words, word_ids):
+    for word in dict.fromkeys(words):
+        word_ids.setdefault(word, len(word_ids))
+    return np.fromiter(map(word_ids.__getitem__, words), dtype=np.int32, count=len(words))
+
+# Generate dictionary of tokens for words ordered by decreasing frequency, with ties kept in order of first appearance,
+# cut off at the words appearing word_frequency_cutoff times or fewer, and a lookup table from word IDs to tokens
+def _word_dictionary(word_ids, counts, word_frequency_cutoff):
+    order = np.argsort(-counts, kind='stable')
+    num_words = np.searchsorted(-counts[order], -word_frequency_cutoff, side='left')
+    words = list(word_ids)
     dictionary = dict()
+    dictionary['UNK'] = len(dictionary)
+    for word_id in order[:num_words]:
+        dictionary[words[word_id]] = len(dictionary)
+    lookup_table = np.full(len(words), dictionary['UNK'], dtype=np.int32)
+    lookup_table[order[:num_words]] = [ dictionary[words[word_id]] for word_id in order[:num_words] ]
+    return dictionary, lookup_table, int(num_words) + 1
+
+# Generate dictionary of tokens for text elements and convert text to tokens, returned as a uint8 array for letters and
+# an int32 array for words
+def text_elements_to_tokens(usecase_flg, text_elements, word_frequency_cutoff):
+    return text_chunks_to_tokens(usecase_flg, [text_elements], word_frequency_cutoff)
+
+# Generate dictionary of tokens and convert text to tokens incrementally from an iterable of chunks of text elements,
+# such as the chunks yielded by read_data_chunks, so that only one chunk of text is held in memory at a time
+def text_chunks_to_tokens(usecase_flg, text_chunks, word_frequency_cutoff):
+    data_chunks = [ np.zeros(0, dtype=np.int32) ]
     if usecase_flg == 1:
-        vocabulary_size = len(string.ascii_lowercase) + 2
-        letters = ['UNK']
-        letters += [' ']
-        for letter in string.ascii_lowercase:
-            letters += [letter]
-        for letter in letters:
-            dictionary[letter] = len(dictionary)
-        vocab_size = vocabulary_size
+        dictionary = _letter_dictionary()
+        data_chunks[0] = data_chunks[0].astype(np.uint8)
+        for text_elements in text_chunks:
+            data_chunks.append(_letters_to_tokens(text_elements, dictionary))
+        data = np.concatenate(data_chunks)
+        vocab_size = len(dictionary)
     elif usecase_flg == 2:
-        words = [['UNK', -1]]
-        words.extend(collections.Counter(text_elements).most_common(len(text_elements)))
-        frequencies = [i[1] for i in words]
-        cutoff = word_frequency_cutoff
-        while cutoff > 0:
-            if cutoff in frequencies:
-                idx = frequencies.index(cutoff)
-                words = words[:idx]
-                cutoff = 0
-            else:
-                cutoff -= 1
-        for word, _ in words:
-            dictionary[word] = len(dictionary)
-        vocab_size = len(words)
-    data = list()
-    for text_element in text_elements:
-        if text_element in dictionary:
-            index = dictionary[text_element]
-        else:
-            index = dictionary['UNK']
-        data.append(index)
+        word_ids = dict()
+        for text_elements in text_chunks:
+            data_chunks.append(_words_to_word_ids(text_elements, word_ids))
+        data = np.concatenate(data_chunks)
+        del data_chunks
+        counts = np.bincount(data, minlength=len(word_ids))
+        dictionary, lookup_table, vocab_size = _word_dictionary(word_ids, counts, word_frequency_cutoff)
+        data = lookup_table[data]
     reverse_dictionary = dict(zip(dictionary.values(), dictionary.keys())) 
     return data, dictionary, reverse_dictionary, vocab_size
 
 # Find text element for probability distribution over tokens
 def token_to_text_element(probabilities, reverse_dictionary):
-    return [reverse_dictionary[token] for token in np.argmax(probabilities, 1)]
\ No newline at end of file
+    return [reverse_dictionary[token] for token in np.argmax(probabilities, 1)]
+
+# Convert text elements to tokens with an existing dictionary, such as the prefix text of a generation, mapping every
+# text element that is not in the dictionary to UNK
+def text_to_tokens(usecase_flg, text_elements, dictionary):
+    if usecase_flg == 1:
+        return _letters_to_tokens(text_elements, dictionary).astype(np.int32)
+    elif usecase_flg == 2:
+        return np.array([ dictionary.get(word, dictionary['UNK']) for word in text_elements ], dtype=np.int32)
+
+# Convert tokens, such as the tokens of a generated continuation, back to text, with letters joined directly and words
+# joined by spaces
+def tokens_to_text(usecase_flg, tokens, reverse_dictionary):
+    text_elements = [ reverse_dictionary[int(token)] for token in tokens ]
+    if usecase_flg == 1:
+        return ''.join(text_elements)
+    elif usecase_flg == 2:
+        return ' '.join(text_elements)
+
+# Count the occurrences of each token in the vocabulary in the data
+def token_counts(data, vocabulary_size):
+    return np.bincount(np.asarray(data).ravel(), minlength=vocabulary_size)